@@ -0,0 +1,128 @@
+"""Асинхронные варианты страниц для чтения.
+
+С настройкой ``BLOG_ASYNC_VIEWS`` (выключена по умолчанию) главная,
+страницы категорий, публикаций и профилей обслуживаются этими
+представлениями: запросы к базе идут через асинхронный ORM, а к кэшу -
+через асинхронные методы. Имеет смысл только под ASGI-сервером
+(``blogicum.asgi``) и только если ``bench_asgi`` показывает выигрыш.
+Разметка и контекст шаблонов те же, что у синхронных представлений из
+``views``.
+"""
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.shortcuts import aget_object_or_404, render
+
+from .cache import (
+    FEED, author_scope, cache_page_for_anonymous, category_scope,
+    conditional_page, post_scope
+)
+from .constants import POSTS_PER_PAGE
+from .forms import CommentForm
+from .fragments import aattach_post_cards, aget_comment_page
+from .models import Category, Post
+from .routers import read_from_replica
+from .utils import apaginate_queryset, get_published_posts
+from .views import comments_context, profile_posts, visible_posts
+
+
+def with_user(view):
+    """Загружает пользователя запроса до вызова представления.
+
+    ``request.user`` ленивый: при первом обращении он синхронно читает
+    сессию и пользователя из базы, а в асинхронном коде это запрещено.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@read_from_replica
+@with_user
+@conditional_page(lambda: (FEED,))
+@cache_page_for_anonymous(lambda: (FEED,))
+async def index(request):
+    post_list = get_published_posts(Post.objects).defer('text').order_by(
+        '-pub_date'
+    )
+
+    page_obj = await apaginate_queryset(post_list, request, POSTS_PER_PAGE)
+    await aattach_post_cards(page_obj)
+
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'blog/index.html', context)
+
+
+@read_from_replica
+@with_user
+@conditional_page(lambda id: (post_scope(id),))
+@cache_page_for_anonymous(lambda id: (post_scope(id),))
+async def post_detail(request, id):
+    post = await aget_object_or_404(
+        visible_posts(request).select_related(
+            'author', 'category', 'location'
+        ),
+        pk=id
+    )
+    context = comments_context(
+        request, post,
+        await aget_comment_page(post, request.GET.get('comments')),
+    )
+    context['form'] = CommentForm()
+    return render(request, 'blog/detail.html', context)
+
+
+@read_from_replica
+@with_user
+@conditional_page(lambda category_slug: (category_scope(category_slug),))
+@cache_page_for_anonymous(
+    lambda category_slug: (category_scope(category_slug),)
+)
+async def category_posts(request, category_slug):
+    category = await aget_object_or_404(
+        Category,
+        slug=category_slug,
+        is_published=True
+    )
+
+    post_list = get_published_posts(category.posts).defer('text').order_by(
+        '-pub_date'
+    )
+
+    page_obj = await apaginate_queryset(post_list, request, POSTS_PER_PAGE)
+    await aattach_post_cards(page_obj)
+
+    context = {
+        'category': category,
+        'page_obj': page_obj,
+    }
+    return render(request, 'blog/category.html', context)
+
+
+async def profile_scopes(username):
+    author_id = await User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).afirst()
+    return (author_scope(author_id),)
+
+
+@read_from_replica
+@with_user
+@conditional_page(profile_scopes)
+async def profile(request, username):
+    profile = await aget_object_or_404(User, username=username)
+    page_obj = await apaginate_queryset(
+        profile_posts(request, profile), request, POSTS_PER_PAGE
+    )
+    await aattach_post_cards(page_obj)
+
+    context = {
+        'profile': profile,
+        'page_obj': page_obj,
+    }
+
+    return render(request, 'blog/profile.html', context)
@@ -0,0 +1,152 @@
+"""Подсказки по префиксу для имён пользователей и категорий.
+
+Индекс хранится в памяти процесса в виде отсортированных списков и
+ищется двоичным поиском, поэтому запросы подсказок не обращаются
+к базе. Изменения в своём процессе применяются к индексу сразу после
+фиксации транзакции, а остальные процессы узнают о них по поколению
+``autocomplete`` в общем кэше и перечитывают индекс целиком.
+"""
+import threading
+from bisect import bisect_left
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .cache import bump_generations, get_generations
+from .models import Category
+
+User = get_user_model()
+
+AUTOCOMPLETE = 'autocomplete'
+SUGGESTIONS_LIMIT = 10
+
+
+def normalize(value):
+    return value.casefold()
+
+
+class PrefixIndex:
+    """Отсортированные пары (ключ, значение) с поиском по префиксу."""
+
+    def __init__(self, items=()):
+        self._items = sorted(
+            (normalize(key), value) for key, value in items
+        )
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, key, value):
+        item = (normalize(key), value)
+        position = bisect_left(self._items, item)
+        if position == len(self._items) or self._items[position] != item:
+            self._items.insert(position, item)
+
+    def discard(self, key, value):
+        item = (normalize(key), value)
+        position = bisect_left(self._items, item)
+        if position < len(self._items) and self._items[position] == item:
+            del self._items[position]
+
+    def search(self, prefix, limit):
+        prefix = normalize(prefix)
+        results = []
+        # срез копировал бы весь хвост списка на каждое нажатие клавиши
+        position = bisect_left(self._items, (prefix,))
+        while position < len(self._items) and len(results) < limit:
+            key, value = self._items[position]
+            if not key.startswith(prefix):
+                break
+            if value not in results:
+                results.append(value)
+            position += 1
+        return results
+
+
+def category_keys(slug, title):
+    # категорию находят и по названию, и по идентификатору из адреса
+    return {title, slug}
+
+
+class AutocompleteIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self.users = PrefixIndex()
+        self.categories = PrefixIndex()
+
+    def _load(self):
+        self.users = PrefixIndex(
+            (username, username) for username in User.objects.filter(
+                is_active=True
+            ).values_list('username', flat=True)
+        )
+        self.categories = PrefixIndex(
+            (key, (slug, title))
+            for slug, title in Category.objects.filter(
+                is_published=True
+            ).values_list('slug', 'title')
+            for key in category_keys(slug, title)
+        )
+
+    def _current(self):
+        generation = get_generations(AUTOCOMPLETE)[AUTOCOMPLETE]
+        if generation != self._generation:
+            self._load()
+            self._generation = generation
+
+    def suggest(self, prefix, limit=SUGGESTIONS_LIMIT):
+        with self._lock:
+            self._current()
+            return (
+                self.users.search(prefix, limit),
+                self.categories.search(prefix, limit),
+            )
+
+    def _change(self, apply):
+        """Применяет изменение к индексу и сообщает о нём процессам.
+
+        Это происходит после фиксации транзакции: иначе другой процесс
+        мог бы перечитать индекс без ещё не видимой ему записи и
+        сохранить его под новым поколением. После отката изменение не
+        применяется. Если индекс процесса уже отстал от общего
+        поколения, изменение тоже не применяется: индекс всё равно
+        будет перечитан целиком.
+        """
+        transaction.on_commit(lambda: self._apply(apply))
+
+    def _apply(self, apply):
+        with self._lock:
+            up_to_date = (
+                self._generation is not None
+                and get_generations(AUTOCOMPLETE)[AUTOCOMPLETE]
+                == self._generation
+            )
+            generation = bump_generations(AUTOCOMPLETE)
+            if up_to_date:
+                apply()
+                self._generation = generation
+
+    def replace_user(self, old=None, new=None):
+        """Заменяет имя пользователя в индексе; None - имени нет."""
+        def apply():
+            if old is not None:
+                self.users.discard(old, old)
+            if new is not None:
+                self.users.add(new, new)
+        self._change(apply)
+
+    def replace_category(self, old=None, new=None):
+        """Заменяет категорию в индексе; old и new - пары (slug, title)."""
+        def apply():
+            if old is not None:
+                for key in category_keys(*old):
+                    self.categories.discard(key, old)
+            if new is not None:
+                for key in category_keys(*new):
+                    self.categories.add(key, new)
+        self._change(apply)
+
+
+index = AutocompleteIndex()
@@ -0,0 +1,204 @@
+"""SQLite с пулом читающих соединений и одним пишущим соединением.
+
+Запросы без записи (ленты, страницы публикаций и профилей) выполняются
+на соединениях из пула и в режиме WAL идут параллельно. Как только поток
+начинает транзакцию или выполняет изменяющий запрос, он берёт
+единственное пишущее соединение процесса; остальные пишущие потоки ждут
+его в очереди, а не повторяют попытки по ``busy_timeout``. Вне
+транзакции соединение возвращается после закрытия курсора, в транзакции
+- после её завершения.
+
+Настройки в ``OPTIONS``: ``pool_size`` - сколько свободных читающих
+соединений хранится, ``write_queue_size`` - сколько потоков может ждать
+записи, ``write_timeout`` - сколько секунд ждать. Очередь общая только
+для потоков одного процесса: несколько процессов по-прежнему ждут
+друг друга через ``busy_timeout``.
+
+База в памяти (тесты) работает как в обычном бэкенде sqlite3.
+"""
+import os
+import re
+
+from django.db.backends.sqlite3.base import (
+    DatabaseWrapper as SQLiteDatabaseWrapper
+)
+from django.db.backends.utils import CursorDebugWrapper, CursorWrapper
+
+from .creation import DatabaseCreation
+from .pool import get_pool, is_usable
+
+POOL_OPTIONS = {
+    'pool_size': os.cpu_count() or 4,
+    'write_queue_size': 64,
+    'write_timeout': 5,
+}
+WRITE_RE = re.compile(
+    r'\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER|ANALYZE|VACUUM'
+    r'|REINDEX|PRAGMA\s+\w+\s*=)',
+    re.IGNORECASE,
+)
+
+
+WITH_RE = re.compile(r'\s*WITH\b', re.IGNORECASE)
+DML_RE = re.compile(r'\b(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+def is_write(sql):
+    if WRITE_RE.match(sql) is not None:
+        return True
+    # у запроса с общими табличными выражениями изменение идёт после них;
+    # слово внутри строки лишь отправит чтение на пишущее соединение
+    return WITH_RE.match(sql) is not None and DML_RE.search(sql) is not None
+
+
+class PoolCursorMixin:
+    """Переводит курсор на пишущее соединение перед изменяющим запросом."""
+
+    holds_writer = False
+
+    def _route(self, sql):
+        if self.db.pool is None:
+            return
+        if is_write(sql):
+            with self.db.wrap_database_errors:
+                self.db.use_writer()
+            self.holds_writer = True
+        if self.cursor.connection is not self.db.connection:
+            self.cursor.close()
+            self.cursor = self.db.create_cursor()
+
+    def _execute(self, sql, params, *ignored_wrapper_args):
+        self._route(sql)
+        return super()._execute(sql, params, *ignored_wrapper_args)
+
+    def _executemany(self, sql, param_list, *ignored_wrapper_args):
+        self._route(sql)
+        return super()._executemany(sql, param_list, *ignored_wrapper_args)
+
+    def close(self):
+        try:
+            self.cursor.close()
+        finally:
+            if self.holds_writer:
+                self.holds_writer = False
+                self.db.release_writer_outside_transaction()
+
+
+class PoolCursorWrapper(PoolCursorMixin, CursorWrapper):
+    pass
+
+
+class PoolCursorDebugWrapper(PoolCursorMixin, CursorDebugWrapper):
+    pass
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.reader = None
+        self.writer = None
+
+    @property
+    def pool_options(self):
+        options = self.settings_dict['OPTIONS']
+        return {
+            name: options.get(name, default)
+            for name, default in POOL_OPTIONS.items()
+        }
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in POOL_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        if self.is_in_memory_db():
+            return super().get_new_connection(conn_params)
+        self.pool = get_pool(self.settings_dict['NAME'], **self.pool_options)
+        self.reader = self.pool.acquire_reader(
+            lambda: self._open_reader(conn_params)
+        )
+        return self.reader
+
+    def _open_reader(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        connection.isolation_level = None
+        connection.execute('PRAGMA query_only = ON')
+        return connection
+
+    def _open_writer(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        connection.isolation_level = None
+        return connection
+
+    def use_writer(self):
+        """Переключает поток на пишущее соединение, дождавшись очереди."""
+        if self.writer is not None:
+            return
+        self.writer = self.pool.acquire_writer(
+            lambda: self._open_writer(self.get_connection_params())
+        )
+        self.connection = self.writer
+
+    def release_writer(self):
+        if self.writer is None:
+            return
+        writer, self.writer = self.writer, None
+        self.connection = self.reader
+        self.pool.release_writer(writer)
+
+    def release_writer_outside_transaction(self):
+        if not self.in_atomic_block and self.get_autocommit():
+            self.release_writer()
+
+    def _start_transaction_under_autocommit(self):
+        if self.pool is None:
+            return super()._start_transaction_under_autocommit()
+        with self.wrap_database_errors:
+            self.use_writer()
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self.release_writer()
+            raise
+
+    def _set_autocommit(self, autocommit):
+        if self.pool is not None and not autocommit:
+            # транзакция без atomic() целиком идёт через пишущее соединение
+            with self.wrap_database_errors:
+                self.use_writer()
+        super()._set_autocommit(autocommit)
+        if self.pool is not None and autocommit:
+            self.release_writer()
+
+    def is_usable(self):
+        # у sqlite3 проверка всегда успешна, и CONN_HEALTH_CHECKS
+        # ничего бы не проверяла
+        return is_usable(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # курсор с записью мог остаться незакрытым до конца запроса
+        if self.connection is not None and self.pool is not None:
+            self.release_writer_outside_transaction()
+
+    def _close(self):
+        if self.pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            try:
+                self.release_writer()
+            finally:
+                reader, self.reader = self.reader, None
+                if reader is not None:
+                    self.pool.release_reader(reader)
+
+    def make_debug_cursor(self, cursor):
+        return PoolCursorDebugWrapper(cursor, self)
+
+    def make_cursor(self, cursor):
+        return PoolCursorWrapper(cursor, self)
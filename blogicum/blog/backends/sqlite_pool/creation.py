@@ -0,0 +1,13 @@
+from django.db.backends.sqlite3.creation import (
+    DatabaseCreation as SQLiteDatabaseCreation
+)
+
+from .pool import close_pool
+
+
+class DatabaseCreation(SQLiteDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # соединения пула держат удаляемый файл открытым
+        close_pool(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
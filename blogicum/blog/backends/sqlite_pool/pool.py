@@ -0,0 +1,153 @@
+"""Пул соединений с одним файлом SQLite.
+
+Читающие соединения открываются с ``PRAGMA query_only`` и хранятся в
+стеке: свободным выдаётся последнее возвращённое, у него тёплый кэш
+страниц. Перед выдачей соединение из стека проверяется запросом. Пишет
+в файл одно соединение: его по очереди берут потоки, остальные ждут в
+ограниченной очереди.
+"""
+import collections
+import queue
+import sqlite3
+import threading
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class WriterQueue:
+    """Очередь потоков к единственному пишущему соединению.
+
+    Соединение выдаётся в порядке обращения. Если ждущих больше
+    ``size`` или соединение не освободилось за ``timeout`` секунд,
+    поднимается ``OperationalError`` - так же, как при блокировке
+    файла.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.connection = None
+        self._busy = False
+        self._waiting = collections.deque()
+        self._condition = threading.Condition()
+
+    def acquire(self, connect):
+        with self._condition:
+            if self._busy or self._waiting:
+                self._wait()
+            self._busy = True
+        if self.connection is None:
+            try:
+                self.connection = connect()
+            except BaseException:
+                self.release()
+                raise
+        return self.connection
+
+    def _wait(self):
+        if len(self._waiting) >= self.size:
+            raise sqlite3.OperationalError(
+                'database is locked: очередь записи переполнена'
+            )
+        ticket = object()
+        self._waiting.append(ticket)
+        try:
+            if not self._condition.wait_for(
+                lambda: not self._busy and self._waiting[0] is ticket,
+                self.timeout,
+            ):
+                raise sqlite3.OperationalError(
+                    'database is locked: соединение для записи занято'
+                )
+        finally:
+            self._waiting.remove(ticket)
+            # следующий в очереди мог ждать именно этот билет
+            self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self._busy = False
+            self._condition.notify_all()
+
+    @property
+    def waiting(self):
+        return len(self._waiting)
+
+
+def is_usable(connection):
+    """Проверяет соединение запросом, который читает файл базы."""
+    try:
+        connection.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchone()
+    except sqlite3.Error:
+        return False
+    return True
+
+
+class ConnectionPool:
+
+    def __init__(self, pool_size, write_queue_size, write_timeout):
+        self.readers = queue.LifoQueue(maxsize=pool_size)
+        self.writer = WriterQueue(write_queue_size, write_timeout)
+
+    def acquire_reader(self, connect):
+        # соединение могло испортиться, пока лежало в пуле
+        while True:
+            try:
+                connection = self.readers.get_nowait()
+            except queue.Empty:
+                return connect()
+            if is_usable(connection):
+                return connection
+            connection.close()
+
+    def release_reader(self, connection):
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            # например, соединение не прошло проверку CONN_HEALTH_CHECKS
+            connection.close()
+            return
+        try:
+            self.readers.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def acquire_writer(self, connect):
+        return self.writer.acquire(connect)
+
+    def release_writer(self, connection):
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        finally:
+            self.writer.release()
+
+    def close(self):
+        while True:
+            try:
+                self.readers.get_nowait().close()
+            except queue.Empty:
+                break
+        if self.writer.connection is not None:
+            self.writer.connection.close()
+            self.writer.connection = None
+
+
+def get_pool(name, pool_size, write_queue_size, write_timeout):
+    """Общий для всех потоков процесса пул файла ``name``."""
+    name = str(name)
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = ConnectionPool(
+                pool_size, write_queue_size, write_timeout
+            )
+        return _pools[name]
+
+
+def close_pool(name):
+    with _pools_lock:
+        pool = _pools.pop(str(name), None)
+    if pool is not None:
+        pool.close()
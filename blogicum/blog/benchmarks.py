@@ -0,0 +1,196 @@
+"""Общие помощники для команд-бенчмарков ``bench_*``.
+
+Бенчмарки работают на отдельной тестовой базе, которая создаётся
+и удаляется самой командой, поэтому рабочие данные не затрагиваются.
+"""
+import importlib
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.urls import clear_url_caches
+from django.utils import timezone
+
+from .models import Category, Comment, Location, Post
+from .utils import estimate_reading_time, make_excerpt
+
+User = get_user_model()
+
+SEED_BATCH_SIZE = 5000
+SEED_AUTHORS = 200
+SEED_CATEGORIES = 20
+SEED_LOCATIONS = 50
+
+
+@contextmanager
+def benchmark_database(keepdb=False, test_name=None):
+    """Создаёт тестовую базу с применёнными миграциями на время замеров.
+
+    ``test_name`` - имя файла базы: по умолчанию тестовая база SQLite
+    создаётся в памяти, а многопоточным замерам нужен файл.
+    """
+    old_name = connection.settings_dict['NAME']
+    if test_name is not None:
+        connection.settings_dict['TEST']['NAME'] = test_name
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+
+
+def _reload_urlconf():
+    # blog.urls выбирает представления при импорте
+    importlib.reload(importlib.import_module('blog.urls'))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@contextmanager
+def async_views(enabled=True):
+    """Обслуживает страницы для чтения асинхронными представлениями.
+
+    Включает или выключает ``BLOG_ASYNC_VIEWS`` и перечитывает адреса,
+    как при запуске под ASGI или WSGI.
+    """
+    try:
+        with override_settings(BLOG_ASYNC_VIEWS=enabled):
+            _reload_urlconf()
+            yield
+    finally:
+        _reload_urlconf()
+
+
+def seed_reference_data():
+    users = User.objects.bulk_create(
+        User(username=f'bench_author_{i}') for i in range(SEED_AUTHORS)
+    )
+    categories = Category.objects.bulk_create(
+        Category(
+            title=f'Категория {i}',
+            description='Категория для замеров',
+            slug=f'bench-category-{i}',
+            # часть категорий снята с публикации
+            is_published=i % 10 != 0,
+        )
+        for i in range(SEED_CATEGORIES)
+    )
+    locations = Location.objects.bulk_create(
+        Location(name=f'Место {i}') for i in range(SEED_LOCATIONS)
+    )
+    return users, categories, locations
+
+
+def seed_posts(total, comments_per_post=0, rng=None):
+    """Добивает таблицу публикаций до ``total`` записей.
+
+    Даты публикаций распределены на несколько лет назад, около 5%
+    записей скрыты и около 1% отложены на будущее.
+    """
+    rng = rng or random.Random(total)
+    if not Category.objects.exists():
+        seed_reference_data()
+    author_ids = list(User.objects.values_list('pk', flat=True))
+    published_categories = dict(
+        Category.objects.values_list('pk', 'is_published')
+    )
+    category_ids = list(published_categories)
+    location_ids = list(Location.objects.values_list('pk', flat=True))
+
+    now = timezone.now()
+    existing = Post.objects.count()
+    while existing < total:
+        batch = []
+        for i in range(existing, min(existing + SEED_BATCH_SIZE, total)):
+            roll = rng.random()
+            if roll < 0.01:
+                pub_date = now + timedelta(days=rng.randint(1, 30))
+            else:
+                pub_date = now - timedelta(seconds=rng.randint(0, 10 ** 8))
+            category_id = rng.choice(category_ids)
+            text = 'Текст публикации для замеров. ' * rng.randint(5, 60)
+            batch.append(Post(
+                title=f'Публикация {i}',
+                text=text,
+                excerpt=make_excerpt(text),
+                reading_time=estimate_reading_time(text),
+                pub_date=pub_date,
+                is_published=roll > 0.05,
+                author_id=rng.choice(author_ids),
+                category_id=category_id,
+                is_visible=(
+                    roll > 0.05
+                    and published_categories[category_id]
+                    and pub_date <= now
+                ),
+                location_id=rng.choice(location_ids),
+                comment_count=comments_per_post,
+            ))
+        posts = Post.objects.bulk_create(batch)
+        if comments_per_post:
+            Comment.objects.bulk_create(
+                Comment(
+                    post=post,
+                    author_id=rng.choice(author_ids),
+                    text='Комментарий для замеров',
+                )
+                for post in posts
+                for _ in range(comments_per_post)
+            )
+        existing += len(batch)
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def index_definitions(names):
+    """SQL создания индексов ``names`` в том виде, в каком они в базе.
+
+    В PostgreSQL индексы лент создаются миграцией с INCLUDE, которого
+    нет в описании моделей, поэтому восстанавливать их нужно по базе.
+    """
+    names = list(names)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT indexname, indexdef FROM pg_indexes '
+                'WHERE indexname = ANY(%s)',
+                [names],
+            )
+        else:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                'AND name IN (%s)' % ', '.join(['%s'] * len(names)),
+                names,
+            )
+        return dict(cursor.fetchall())
+
+
+def measure(func, repeat=5, clock=time.perf_counter):
+    """Медиана времени выполнения ``func`` в миллисекундах.
+
+    С ``clock=time.process_time`` замеряется процессорное время.
+    """
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = clock()
+        func()
+        timings.append((clock() - started) * 1000)
+    return statistics.median(timings)
+
+
+def parse_sizes(value):
+    return [int(size.replace('_', '')) for size in value.split(',')]
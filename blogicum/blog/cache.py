@@ -0,0 +1,272 @@
+"""Кэш страниц блога и поколения для его инвалидации.
+
+У каждой области (лента, категория, автор, публикация) есть номер
+поколения. Он входит в ключи кэша, поэтому после изменения данных
+достаточно сменить поколение - старые записи просто перестают
+читаться и вытесняются по таймауту.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+GENERATION_KEY_PREFIX = 'blog:gen:'
+PAGE_KEY_PREFIX = 'blog:page:'
+
+# названия категорий и мест, имена пользователей видны на всех страницах
+SITE = 'site'
+FEED = 'feed'
+
+_last_generation = 0
+_generation_lock = threading.Lock()
+
+
+def category_scope(category_slug):
+    return f'category:{category_slug}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(post):
+    """Области, содержимое которых зависит от публикации."""
+    scopes = [FEED, author_scope(post.author_id), post_scope(post.pk)]
+    if post.category_id is not None:
+        scopes.append(category_scope(post.category.slug))
+    return scopes
+
+
+def _new_generation():
+    # поколение - это время смены в микросекундах; внутри процесса оно
+    # строго растёт
+    global _last_generation
+    with _generation_lock:
+        _last_generation = max(time.time_ns() // 1000, _last_generation + 1)
+        return _last_generation
+
+
+def get_generations(*scopes):
+    """Текущие поколения областей одним запросом к кэшу."""
+    keys = {GENERATION_KEY_PREFIX + scope: scope for scope in scopes}
+    found = cache.get_many(keys)
+    missing = {key: _new_generation() for key in keys if key not in found}
+    if missing:
+        # конкурирующий процесс мог успеть записать своё значение
+        for key, generation in missing.items():
+            if not cache.add(key, generation, None):
+                generation = cache.get(key, generation)
+            found[key] = generation
+    return {keys[key]: generation for key, generation in found.items()}
+
+
+async def aget_generations(*scopes):
+    """Асинхронный вариант ``get_generations``."""
+    keys = {GENERATION_KEY_PREFIX + scope: scope for scope in scopes}
+    found = await cache.aget_many(keys)
+    missing = {key: _new_generation() for key in keys if key not in found}
+    for key, generation in missing.items():
+        if not await cache.aadd(key, generation, None):
+            generation = await cache.aget(key, generation)
+        found[key] = generation
+    return {keys[key]: generation for key, generation in found.items()}
+
+
+def bump_generations(*scopes):
+    generation = _new_generation()
+    cache.set_many(
+        {GENERATION_KEY_PREFIX + scope: generation for scope in set(scopes)},
+        None
+    )
+    return generation
+
+
+def bump_generations_on_commit(*scopes):
+    """Меняет поколения областей сейчас и ещё раз после фиксации.
+
+    Пока транзакция открыта, другие запросы видят прежние данные и
+    могут закэшировать их под уже новым поколением, поэтому после
+    фиксации поколение меняется повторно. Первая смена нужна самой
+    транзакции: её запросы уже видят изменения.
+    """
+    bump_generations(*scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_generations(*scopes))
+
+
+READ_YOUR_WRITES_COOKIE = 'blog_recent_write'
+
+
+def recently_wrote(request):
+    return READ_YOUR_WRITES_COOKIE in request.COOKIES
+
+
+def page_cache_key(request, generations):
+    """Ключ страницы: адрес с параметрами и поколения её областей."""
+    versions = ','.join(
+        f'{scope}={generations[scope]}' for scope in sorted(generations)
+    )
+    raw = f'{request.get_full_path()}|{versions}'
+    return PAGE_KEY_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _bypasses_page_cache(request):
+    return (
+        request.method not in ('GET', 'HEAD')
+        or request.user.is_authenticated
+        or recently_wrote(request)
+    )
+
+
+def _cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def _cached_page(view, get_scopes):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if _bypasses_page_cache(request):
+            return view(request, *args, **kwargs)
+
+        generations = get_generations(SITE, *get_scopes(*args, **kwargs))
+        key = page_cache_key(request, generations)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, *args, **kwargs)
+        if _cacheable(response):
+            cache.set(
+                key,
+                (response.content, response['Content-Type']),
+                settings.BLOG_PAGE_CACHE_TIMEOUT,
+            )
+        return response
+    return wrapper
+
+
+def _async_cached_page(view, get_scopes):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if _bypasses_page_cache(request):
+            return await view(request, *args, **kwargs)
+
+        generations = await aget_generations(
+            SITE, *get_scopes(*args, **kwargs)
+        )
+        key = page_cache_key(request, generations)
+        cached = await cache.aget(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = await view(request, *args, **kwargs)
+        if _cacheable(response):
+            await cache.aset(
+                key,
+                (response.content, response['Content-Type']),
+                settings.BLOG_PAGE_CACHE_TIMEOUT,
+            )
+        return response
+    return wrapper
+
+
+def cache_page_for_anonymous(get_scopes):
+    """Кэширует ответ представления целиком для анонимных читателей.
+
+    ``get_scopes`` получает аргументы представления и возвращает
+    области, от которых зависит страница. Авторизованные пользователи
+    (страница содержит их имя и формы) и те, кто только что что-то
+    изменил, получают страницу в обход кэша. Асинхронное представление
+    обращается к кэшу асинхронно.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_cached_page(view, get_scopes)
+        return _cached_page(view, get_scopes)
+    return decorator
+
+
+def _request_generations(request, get_scopes, args, kwargs):
+    # асинхронная обёртка читает поколения заранее
+    if not hasattr(request, '_blog_generations'):
+        request._blog_generations = get_generations(
+            SITE, *get_scopes(*args, **kwargs)
+        )
+    return request._blog_generations
+
+
+def conditional_page(get_scopes):
+    """Отдаёт 304, пока не изменились поколения областей страницы.
+
+    ETag считается по поколениям из кэша, поэтому на ответ 304 не
+    тратится ни запрос страницы, ни отрисовка шаблона.
+    Авторизованному пользователю страница показывается с его именем и
+    CSRF-токеном, поэтому они тоже входят в ETag. Last-Modified не
+    отдаётся: его точность - секунда, и изменение в ту же секунду, что
+    и прошлая отрисовка, клиент с одним If-Modified-Since не заметил бы.
+
+    Для асинхронного представления поколения читаются из кэша заранее
+    и асинхронно, а ``get_scopes`` тоже может быть асинхронной.
+    """
+    def etag(request, *args, **kwargs):
+        generations = _request_generations(
+            request, get_scopes, args, kwargs
+        )
+        parts = [f'{scope}={generations[scope]}'
+                 for scope in sorted(generations)]
+        if request.user.is_authenticated:
+            parts.append(f'user={request.user.pk}')
+            parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    conditional = condition(etag_func=etag)
+
+    def decorator(view):
+        conditional_view = conditional(view)
+        if not iscoroutinefunction(view):
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                return _validated_only_if_ok(
+                    conditional_view(request, *args, **kwargs)
+                )
+            return wrapper
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            # condition() вызывает etag синхронно
+            scopes = get_scopes(*args, **kwargs)
+            if iscoroutinefunction(get_scopes):
+                scopes = await scopes
+            request._blog_generations = await aget_generations(
+                SITE, *scopes
+            )
+            return _validated_only_if_ok(
+                await conditional_view(request, *args, **kwargs)
+            )
+        return async_wrapper
+    return decorator
+
+
+def _validated_only_if_ok(response):
+    # по ETag ответа 404 клиент получил бы 304 и продолжал бы показывать
+    # скрытую или удалённую публикацию
+    if response.status_code not in (200, 304):
+        response.headers.pop('ETag', None)
+    return response
@@ -0,0 +1,164 @@
+"""Сжатие gzip и brotli.
+
+brotli - необязательная зависимость (``pip install brotli``): без неё
+всё сжимается только gzip.
+"""
+import gzip
+import re
+import secrets
+import shutil
+import zlib
+from io import BytesIO
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# в порядке предпочтения: brotli сжимает текст заметно лучше
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+# текстовые форматы; изображения, архивы и шрифты woff уже сжаты
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'application/manifest+json',
+    'image/svg+xml',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+)
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?')
+
+
+def is_compressible(content_type):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(header):
+    """Кодировки из ``Accept-Encoding``, которые клиент принимает."""
+    accepted = set()
+    rejected = set()
+    for part in (header or '').split(','):
+        match = ACCEPT_ENCODING_RE.match(part)
+        if not match:
+            continue
+        coding, quality = match.groups()
+        try:
+            quality = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+        (accepted if quality > 0 else rejected).add(coding.lower())
+    if '*' in accepted:
+        accepted |= set(ENCODINGS) - rejected
+    return accepted
+
+
+def choose_encoding(header, encodings=None):
+    accepted = accepted_encodings(header)
+    for encoding in ENCODINGS if encodings is None else encodings:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def compress_file(path, encoding, level=None):
+    """Пишет сжатую копию файла рядом с ним и возвращает её путь."""
+    target = path + EXTENSIONS[encoding]
+    if encoding == 'gzip':
+        # mtime=0: одинаковое содержимое даёт одинаковый архив
+        with open(path, 'rb') as source, gzip.GzipFile(
+            target, 'wb', compresslevel=level or 9, mtime=0
+        ) as compressed:
+            shutil.copyfileobj(source, compressed)
+    else:
+        with open(path, 'rb') as source:
+            data = brotli.compress(
+                source.read(), quality=11 if level is None else level
+            )
+        with open(target, 'wb') as compressed:
+            compressed.write(data)
+    return target
+
+
+class GzipEncoder:
+    """Потоковое сжатие gzip.
+
+    ``max_random_bytes`` добавляет в заголовок случайной длины имя
+    файла, как ``GZipMiddleware``: так размер ответа не выдаёт
+    совпадения секретов со введёнными данными (атака BREACH).
+    """
+
+    def __init__(self, level, max_random_bytes=0):
+        self.buffer = BytesIO()
+        filename = (
+            b'a' * secrets.randbelow(max_random_bytes)
+            if max_random_bytes else None
+        )
+        self.file = gzip.GzipFile(
+            filename=filename, mode='wb', compresslevel=level,
+            fileobj=self.buffer, mtime=0,
+        )
+
+    def _read(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def compress(self, data):
+        self.file.write(data)
+        return self._read()
+
+    def flush(self):
+        self.file.flush(zlib.Z_SYNC_FLUSH)
+        return self._read()
+
+    def finish(self):
+        self.file.close()
+        return self._read()
+
+
+class BrotliEncoder:
+
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def make_encoder(encoding, level, max_random_bytes=0):
+    if encoding == 'br':
+        return BrotliEncoder(level)
+    return GzipEncoder(level, max_random_bytes)
+
+
+def compress(data, encoder):
+    return encoder.compress(data) + encoder.finish()
+
+
+def compress_stream(chunks, encoder):
+    # каждая часть сбрасывается сразу, чтобы клиент получал её без
+    # задержки, как и без сжатия
+    for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def acompress_stream(chunks, encoder):
+    async for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
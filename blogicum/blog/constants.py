@@ -1,2 +1,5 @@
 FIELD_MAX_LENGTH = 256
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+EXCERPT_WORDS = 10
+READING_WORDS_PER_MINUTE = 200
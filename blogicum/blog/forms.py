@@ -1,12 +1,26 @@
 from django import forms
 
 from .models import Comment, Post
+from .uploads import BoundedImageField, size_error
 
 
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, oversized_uploads=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        # файл, отброшенный при приёме, в request.FILES уже не попадает
+        self.oversized_uploads = oversized_uploads
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in self.oversized_uploads:
+            if field in self.fields:
+                self.add_error(field, size_error())
+        return cleaned_data
+
     class Meta:
         model = Post
         exclude = ('author', 'location',)
+        field_classes = {'image': BoundedImageField}
 
 
 class CommentForm(forms.ModelForm):
@@ -0,0 +1,159 @@
+"""Кэш отрисованных фрагментов: карточек публикаций и комментариев.
+
+Ключ фрагмента содержит поколения публикации и сайта, поэтому после
+изменения публикации, её комментариев, категории, места или автора
+фрагмент просто перестаёт читаться. Поколения меняются ещё раз после
+фиксации транзакции, поэтому фрагмент, отрисованный параллельным
+запросом по незафиксированным данным, тоже не читается. Все карточки
+страницы выбираются из кэша одним запросом get_many, комментарии
+кэшируются постранично.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache import SITE, aget_generations, get_generations, post_scope
+from .constants import COMMENTS_PER_PAGE
+from .paginators import CursorPaginator, InvalidCursor
+
+CommentFragment = namedtuple('CommentFragment', ('id', 'author_id', 'html'))
+CommentPage = namedtuple('CommentPage', ('comments', 'next_cursor'))
+
+
+def _fragment_key(kind, post_id, generations):
+    return (
+        f'blog:{kind}:{post_id}:'
+        f'{generations[post_scope(post_id)]}:{generations[SITE]}'
+    )
+
+
+def _card_keys(posts, generations):
+    return {post.pk: _fragment_key('card', post.pk, generations)
+            for post in posts}
+
+
+def _render_cards(posts, keys, cached):
+    """Прикрепляет карточки и возвращает заново отрисованные."""
+    rendered = {}
+    for post in posts:
+        key = keys[post.pk]
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string(
+                'includes/post_card.html', {'post': post}
+            )
+        post.card_html = mark_safe(html)
+    return rendered
+
+
+def attach_post_cards(posts):
+    """Добавляет публикациям готовую разметку карточки ``card_html``."""
+    posts = list(posts)
+    if not posts:
+        return
+    generations = get_generations(
+        SITE, *(post_scope(post.pk) for post in posts)
+    )
+    keys = _card_keys(posts, generations)
+    rendered = _render_cards(posts, keys, cache.get_many(keys.values()))
+    if rendered:
+        cache.set_many(rendered, settings.BLOG_FRAGMENT_CACHE_TIMEOUT)
+
+
+async def aattach_post_cards(posts):
+    """Асинхронный вариант ``attach_post_cards``."""
+    posts = list(posts)
+    if not posts:
+        return
+    generations = await aget_generations(
+        SITE, *(post_scope(post.pk) for post in posts)
+    )
+    keys = _card_keys(posts, generations)
+    rendered = _render_cards(
+        posts, keys, await cache.aget_many(keys.values())
+    )
+    if rendered:
+        await cache.aset_many(rendered, settings.BLOG_FRAGMENT_CACHE_TIMEOUT)
+
+
+def _comment_paginator(post, cursor):
+    """Пагинатор комментариев и проверенный курсор.
+
+    Курсор проверяется до обращения к кэшу, запрос здесь не выполняется;
+    неверный курсор заменяется первой страницей.
+    """
+    paginator = CursorPaginator(
+        post.comments.filter(is_published=True).select_related('author'),
+        COMMENTS_PER_PAGE,
+        field='created_at',
+        descending=False,
+    )
+    try:
+        paginator.page_queryset(cursor)
+    except InvalidCursor:
+        cursor = None
+    return paginator, cursor
+
+
+def _comments_key(post, generations, cursor):
+    return _fragment_key('comments', post.pk, generations) + f':{cursor or ""}'
+
+
+def _render_comments(page):
+    return (
+        [
+            CommentFragment(
+                comment.pk,
+                comment.author_id,
+                render_to_string(
+                    'includes/comment_body.html', {'comment': comment}
+                ),
+            )
+            for comment in page
+        ],
+        page.next_cursor,
+    )
+
+
+def _comment_page(cached):
+    fragments, next_cursor = cached
+    return CommentPage(
+        [
+            fragment._replace(html=mark_safe(fragment.html))
+            for fragment in fragments
+        ],
+        next_cursor,
+    )
+
+
+def get_comment_page(post, cursor=None):
+    """Страница опубликованных комментариев в виде готовой разметки.
+
+    Комментарии идут по (created_at, id) и выбираются по курсору.
+    Кнопки редактирования и удаления зависят от читателя, поэтому
+    в кэш они не попадают: шаблон добавляет их по ``author_id``.
+    Неверный курсор даёт первую страницу.
+    """
+    paginator, cursor = _comment_paginator(post, cursor)
+    generations = get_generations(SITE, post_scope(post.pk))
+    key = _comments_key(post, generations, cursor)
+    cached = cache.get(key)
+    if cached is None:
+        cached = _render_comments(paginator.page(cursor))
+        cache.set(key, cached, settings.BLOG_FRAGMENT_CACHE_TIMEOUT)
+    return _comment_page(cached)
+
+
+async def aget_comment_page(post, cursor=None):
+    """Асинхронный вариант ``get_comment_page``."""
+    paginator, cursor = _comment_paginator(post, cursor)
+    generations = await aget_generations(SITE, post_scope(post.pk))
+    key = _comments_key(post, generations, cursor)
+    cached = await cache.aget(key)
+    if cached is None:
+        cached = _render_comments(await paginator.apage(cursor))
+        await cache.aset(key, cached, settings.BLOG_FRAGMENT_CACHE_TIMEOUT)
+    return _comment_page(cached)
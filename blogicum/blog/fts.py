@@ -0,0 +1,168 @@
+"""Индекс полнотекстового поиска SQLite FTS5.
+
+Модуль не зависит от моделей, поэтому его используют и миграции.
+"""
+import re
+
+POST_FTS_TABLE = 'blog_post_fts'
+COMMENT_FTS_TABLE = 'blog_comment_fts'
+
+# Таблицы FTS5 с внешним содержимым: текст хранится только в blog_post и
+# blog_comment, а триггеры поддерживают индекс при любых изменениях,
+# в том числе при bulk_create, update() и loaddata.
+SCHEMA_SQL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts USING fts5(
+        title, text,
+        content='blog_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_post_fts_insert
+    AFTER INSERT ON blog_post BEGIN
+        INSERT INTO blog_post_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_post_fts_delete
+    AFTER DELETE ON blog_post BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_post_fts_update
+    AFTER UPDATE OF title, text ON blog_post BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO blog_post_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS blog_comment_fts USING fts5(
+        text,
+        content='blog_comment', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_comment_fts_insert
+    AFTER INSERT ON blog_comment BEGIN
+        INSERT INTO blog_comment_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_comment_fts_delete
+    AFTER DELETE ON blog_comment BEGIN
+        INSERT INTO blog_comment_fts(blog_comment_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_comment_fts_update
+    AFTER UPDATE OF text ON blog_comment BEGIN
+        INSERT INTO blog_comment_fts(blog_comment_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO blog_comment_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS blog_comment_fts_update',
+    'DROP TRIGGER IF EXISTS blog_comment_fts_delete',
+    'DROP TRIGGER IF EXISTS blog_comment_fts_insert',
+    'DROP TABLE IF EXISTS blog_comment_fts',
+    'DROP TRIGGER IF EXISTS blog_post_fts_update',
+    'DROP TRIGGER IF EXISTS blog_post_fts_delete',
+    'DROP TRIGGER IF EXISTS blog_post_fts_insert',
+    'DROP TABLE IF EXISTS blog_post_fts',
+)
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def create_schema(connection):
+    """Создаёт таблицы и триггеры индекса, если их ещё нет.
+
+    При пересоздании таблицы blog_post или blog_comment миграцией
+    SQLite удаляет её триггеры, поэтому схема проверяется после
+    каждого migrate.
+    """
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for statement in SCHEMA_SQL:
+            cursor.execute(statement)
+
+
+def drop_schema(connection):
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+# таблица с текстом и индексируемые столбцы для каждого индекса
+CONTENT = {
+    POST_FTS_TABLE: ('blog_post', 'title, text'),
+    COMMENT_FTS_TABLE: ('blog_comment', 'text'),
+}
+
+
+def reindex(connection, table, low, high):
+    """Заново индексирует записи с pk в диапазоне [low, high).
+
+    Из индекса удаляются только записи, которые в нём есть (по таблице
+    ``_docsize``) и ещё есть в таблице с текстом: FTS5 с внешним
+    содержимым считает, что удалять, по текущему тексту записи. Вызывать
+    внутри транзакции - тогда триггеры не изменят эти записи между
+    удалением и вставкой, и ничего не попадёт в индекс дважды.
+    """
+    content, columns = CONTENT[table]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE rowid IN ('
+            f'SELECT docsize.id FROM {table}_docsize docsize '
+            f'JOIN {content} ON {content}.id = docsize.id '
+            'WHERE docsize.id >= %s AND docsize.id < %s)',
+            (low, high),
+        )
+        cursor.execute(
+            f'INSERT INTO {table}(rowid, {columns}) '
+            f'SELECT id, {columns} FROM {content} '
+            'WHERE id >= %s AND id < %s',
+            (low, high),
+        )
+
+
+def rebuild(connection):
+    """Перестраивает индекс целиком по таблицам с текстом.
+
+    Команда FTS5 ``rebuild`` исправляет и записи, изменённые, пока
+    триггеров не было, но занимает запись в базу на всё перестроение.
+    """
+    with connection.cursor() as cursor:
+        for table in CONTENT:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """Превращает ввод пользователя в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки (синтаксис FTS5 пользователю
+    недоступен), все слова должны встретиться, последнее ищется как
+    префикс - так поиск работает и по недописанному слову.
+    """
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
@@ -0,0 +1,221 @@
+"""Обработка изображений публикаций в фоновом пуле.
+
+Оригинал поворачивается по EXIF и очищается от метаданных (в них
+бывают координаты съёмки), затем для него создаются версии
+фиксированной ширины для карточки и страницы публикации, вдвое
+большие для экранов высокой плотности, и каждая - в JPEG и WebP.
+Файлы хранятся под хэшем содержимого (см. ``blog.storage``), поэтому
+версии можно кэшировать навсегда.
+
+Сведения о версиях и размеры оригинала хранятся в
+``Post.image_renditions``::
+
+    {
+        'source': 'post_images/ab/cd/abcd….jpg',
+        'width': 4000, 'height': 3000,
+        'renditions': {
+            'card': {'width': 640, 'height': 480,
+                     'jpeg': 'post_images/renditions/12/34/1234….jpg',
+                     'webp': 'post_images/renditions/56/78/5678….webp'},
+            ...
+        },
+    }
+"""
+import hashlib
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .cache import bump_generations_on_commit, post_scopes
+from .models import Post
+
+# наибольшая ширина версии; версии _2x - для экранов высокой плотности
+RENDITIONS = {
+    'card': 640,
+    'card_2x': 1280,
+    'detail': 1200,
+    'detail_2x': 2400,
+}
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True,
+                             'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+RENDITIONS_DIR = 'post_images/renditions'
+# карточки и страница публикации в шаблонах шириной 40rem
+SIZES = '(max-width: 640px) 100vw, 640px'
+
+
+def rendition_name(rendition, extension):
+    # имя даёт хранилище по содержимому, здесь важны каталог и расширение
+    return posixpath.join(RENDITIONS_DIR, f'{rendition}.{extension}')
+
+
+def encode(image, format_name):
+    pil_format, _, options = FORMATS[format_name]
+    if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+# форматы, в которых поворот и удаление метаданных не теряют анимацию
+NORMALIZED_FORMATS = {
+    'JPEG': {'quality': 92, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+
+
+def normalize_original(storage, name):
+    """Поворачивает оригинал по EXIF и удаляет из него метаданные.
+
+    Очищенный файл сохраняется под новым именем, которое и
+    возвращается; если очищать нечего, возвращается исходное имя.
+    """
+    with storage.open(name, 'rb') as source:
+        with Image.open(source) as image:
+            options = NORMALIZED_FORMATS.get(image.format)
+            if options is None or not (
+                image.getexif() or any(key in image.info
+                                       for key in METADATA_KEYS)
+            ):
+                return name
+            image_format = image.format
+            icc_profile = image.info.get('icc_profile')
+            normalized = ImageOps.exif_transpose(image)
+    for key in METADATA_KEYS:
+        normalized.info.pop(key, None)
+    if icc_profile:
+        options = {**options, 'icc_profile': icc_profile}
+    buffer = BytesIO()
+    normalized.save(buffer, image_format, **options)
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def make_renditions(storage, source_name):
+    """Создаёт версии изображения и возвращает сведения о них."""
+    with storage.open(source_name, 'rb') as source:
+        with Image.open(source) as original:
+            width, height = original.size
+            largest = max(RENDITIONS.values())
+            # JPEG декодируется сразу в уменьшенном в 2-8 раз виде, так
+            # память не зависит от разрешения фотографии
+            original.draft('RGB', (largest, largest * height // width))
+            original.load()
+    renditions = {}
+    saved = {}
+    for rendition, max_width in RENDITIONS.items():
+        # изображение никогда не увеличивается: маленьким оригиналам
+        # достаются одинаковые версии, и сохраняются они один раз
+        image = original.copy()
+        image.thumbnail((max_width, height), Image.LANCZOS)
+        info = {'width': image.width, 'height': image.height}
+        for format_name, (_, extension, _) in FORMATS.items():
+            content = encode(image, format_name)
+            key = (extension, hashlib.sha256(content).digest())
+            if key not in saved:
+                saved[key] = storage.save(
+                    rendition_name(rendition, extension), ContentFile(content)
+                )
+            info[format_name] = saved[key]
+        renditions[rendition] = info
+    return {
+        'source': source_name,
+        'width': width,
+        'height': height,
+        'renditions': renditions,
+    }
+
+
+def rendition_names(data):
+    return {
+        info[format_name]
+        for info in data.get('renditions', {}).values()
+        for format_name in FORMATS
+    }
+
+
+def image_files(name, data):
+    """Оригинал и версии, созданные именно для него."""
+    names = {name} if name else set()
+    if data and data.get('source') == name:
+        names |= rendition_names(data)
+    return names
+
+
+def release_files(storage, names):
+    # каждая версия сохранялась один раз на публикацию, поэтому и
+    # освобождается один раз, сколько бы размеров на неё ни ссылалось
+    for name in names:
+        storage.delete(name)
+
+
+def generate_post_renditions(post_id):
+    """Задача для пула: очищает оригинал и создаёт его версии."""
+    post = Post.objects.select_related('category').only(
+        'image', 'image_renditions', 'author_id', 'category__slug'
+    ).filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    storage = post.image.storage
+    uploaded = post.image.name
+    if not storage.exists(uploaded):
+        # публикацию удалили вместе с файлом, пока задача ждала очереди
+        return
+    name = normalize_original(storage, uploaded)
+    data = make_renditions(storage, name)
+    # изображение могли заменить, пока оно обрабатывалось
+    updated = Post.objects.filter(pk=post_id, image=uploaded).update(
+        image=name, image_renditions=data
+    )
+    if not updated:
+        # изображение заменили или публикацию удалили
+        release_files(storage, rendition_names(data) | ({name} - {uploaded}))
+        return
+    # при повторной обработке освобождаются прежние версии
+    release_files(
+        storage,
+        image_files(uploaded, post.image_renditions) - {name},
+    )
+    bump_generations_on_commit(*post_scopes(post))
+
+
+def picture(post, kind):
+    """Данные для тега <picture> с версиями изображения публикации."""
+    data = post.image_renditions or {}
+    if data.get('source') != post.image.name:
+        data = {}
+    if not data.get('renditions'):
+        # версии ещё не готовы - показываем оригинал
+        return {
+            'src': post.image.url,
+            'width': data.get('width'),
+            'height': data.get('height'),
+        }
+    storage = post.image.storage
+    base = data['renditions'][kind]
+    # браузер сам выбирает подходящую версию по ширине и плотности экрана
+    versions = sorted(
+        {(info['width'], info['jpeg'], info['webp'])
+         for info in data['renditions'].values()}
+    )
+
+    def srcset(column):
+        return ', '.join(
+            f'{storage.url(version[column])} {version[0]}w'
+            for version in versions
+        )
+
+    return {
+        'src': storage.url(base['jpeg']),
+        'srcset': srcset(1),
+        'webp_srcset': srcset(2),
+        'sizes': SIZES,
+        'width': base['width'],
+        'height': base['height'],
+    }
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+
+from blog.images import generate_post_renditions
+from blog.models import Post
+from blog.utils import iterate_in_chunks
+
+
+def generate_in_thread(post_id):
+    try:
+        generate_post_renditions(post_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт уменьшенные версии изображений публикаций, у которых их '
+        'ещё нет (например, загруженных до появления версий).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько публикаций выбирать из базы за раз.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.BLOG_WORKERS,
+            help='Сколько изображений обрабатывать параллельно; 0 - по '
+                 'одному в основном потоке.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать версии и для публикаций, у которых они есть.'
+        )
+
+    def handle(self, *args, chunk_size, workers, force, **options):
+        posts = Post.objects.exclude(Q(image='') | Q(image__isnull=True))
+        executor = ThreadPoolExecutor(workers) if workers else None
+        done = 0
+        for chunk in iterate_in_chunks(
+            posts.values_list('pk', 'image', 'image_renditions'), chunk_size
+        ):
+            pending = [
+                pk for pk, image, renditions in chunk
+                if force or renditions.get('source') != image
+            ]
+            if executor is None:
+                for pk in pending:
+                    generate_post_renditions(pk)
+            else:
+                # list() дожидается обработки порции и пробрасывает ошибки
+                list(executor.map(generate_in_thread, pending))
+            done += len(pending)
+            self.stdout.write(f'Обработано изображений: {done}')
+        if executor is not None:
+            executor.shutdown()
+        self.stdout.write(self.style.SUCCESS('Готово.'))
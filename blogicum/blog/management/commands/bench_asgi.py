@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+
+from blog.backends.sqlite_pool.pool import close_pool
+from blog.benchmarks import async_views, benchmark_database, seed_posts
+from blog.models import Category, Post
+
+User = get_user_model()
+
+MODES = (
+    ('wsgi', 'WSGI, синхронные представления, поток на клиента'),
+    ('asgi', 'ASGI, асинхронные представления, задача на клиента'),
+)
+
+
+def rss():
+    """Текущий объём резидентной памяти процесса в байтах."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # без /proc доступен только пиковый объём (в КБ на Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Monitor(threading.Thread):
+    """Замечает пиковые память и число потоков процесса во время замера."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stopped = threading.Event()
+        self.peak_rss = rss()
+        self.peak_threads = threading.active_count()
+
+    def run(self):
+        while not self.stopped.wait(0.005):
+            self.peak_rss = max(self.peak_rss, rss())
+            self.peak_threads = max(
+                self.peak_threads, threading.active_count()
+            )
+
+
+def wsgi_environ(path, cookie):
+    path, _, query = path.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+def wsgi_get(handler, path, cookie):
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status[:3]))
+
+    body = handler(wsgi_environ(path, cookie), start_response)
+    try:
+        for _ in body:
+            pass
+    finally:
+        # как WSGI-сервер: close() завершает запрос и его соединения
+        body.close()
+    return statuses[0]
+
+
+async def asgi_get(handler, path, cookie):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    finished = asyncio.Event()
+    request_sent = False
+    statuses = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # клиент не отключается, пока не получит ответ целиком
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+        elif not message.get('more_body'):
+            finished.set()
+
+    await handler(scope, receive, send)
+    finished.set()
+    return statuses[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает обслуживание лент, страниц категорий, публикаций и '
+        'профилей под WSGI (синхронные представления, поток на запрос) и '
+        'под ASGI (асинхронные представления в цикле событий) при '
+        'одинаковом числе одновременных клиентов: запросы в секунду, '
+        'задержки, пиковые число потоков и прирост памяти процесса. '
+        'Каждый режим замеряется в отдельном процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Сколько клиентов работает одновременно.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Сколько секунд длится каждый замер.'
+        )
+
+    def handle(self, *args, concurrency, duration, **options):
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        if connection.vendor != 'sqlite':
+            with benchmark_database():
+                self._compare(concurrency, duration)
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            with benchmark_database(
+                test_name=os.path.join(directory, 'bench.sqlite3')
+            ):
+                self._compare(concurrency, duration)
+
+    def _compare(self, concurrency, duration):
+        cookies, paths = self._seed(concurrency)
+        # процессы замеров открывают свои соединения
+        connections.close_all()
+        close_pool(connection.settings_dict['NAME'])
+        context = multiprocessing.get_context('fork')
+        for mode, title in MODES:
+            results = context.Queue()
+            process = context.Process(
+                target=self._measure,
+                args=(mode, cookies, paths, duration, results),
+            )
+            process.start()
+            result = results.get()
+            process.join()
+            self._report(title, result, duration)
+
+    def _seed(self, concurrency):
+        seed_posts(2000)
+        readers = User.objects.bulk_create(
+            User(username=f'bench_reader_{i}') for i in range(concurrency)
+        )
+        # авторизованные читатели получают страницы в обход кэша страниц
+        cookies = []
+        for reader in readers:
+            client = Client()
+            client.force_login(reader)
+            cookies.append('{}={}'.format(
+                settings.SESSION_COOKIE_NAME,
+                client.cookies[settings.SESSION_COOKIE_NAME].value,
+            ))
+        posts = Post.objects.filter(is_visible=True).select_related(
+            'author'
+        )[:100]
+        paths = ['/', '/?page=2']
+        paths += [f'/posts/{post.pk}/' for post in posts]
+        paths += sorted(
+            {f'/profile/{post.author.username}/' for post in posts}
+        )
+        paths += [
+            f'/category/{slug}/' for slug in Category.objects.filter(
+                is_published=True
+            ).values_list('slug', flat=True)
+        ]
+        return cookies, paths
+
+    def _measure(self, mode, cookies, paths, duration, results):
+        with async_views(mode == 'asgi'):
+            before = rss()
+            monitor = Monitor()
+            monitor.start()
+            if mode == 'asgi':
+                timings, errors = asyncio.run(
+                    self._asgi_clients(cookies, paths, duration)
+                )
+            else:
+                timings, errors = self._wsgi_clients(
+                    cookies, paths, duration
+                )
+            monitor.stopped.set()
+            monitor.join()
+        results.put({
+            'timings': timings,
+            'errors': errors,
+            'threads': monitor.peak_threads,
+            'rss': before,
+            'rss_growth': monitor.peak_rss - before,
+        })
+
+    def _wsgi_clients(self, cookies, paths, duration):
+        handler = WSGIHandler()
+        timings = []
+        errors = []
+        deadline = time.perf_counter() + duration
+
+        def client_loop(cookie):
+            rng = random.Random(cookie)
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = wsgi_get(handler, rng.choice(paths), cookie)
+                if status != 200:
+                    errors.append(status)
+                    continue
+                timings.append((time.perf_counter() - started) * 1000)
+
+        workers = [
+            threading.Thread(target=client_loop, args=(cookie,))
+            for cookie in cookies
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return timings, errors
+
+    async def _asgi_clients(self, cookies, paths, duration):
+        handler = ASGIHandler()
+        timings = []
+        errors = []
+        deadline = time.perf_counter() + duration
+
+        async def client_loop(cookie):
+            rng = random.Random(cookie)
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = await asgi_get(handler, rng.choice(paths), cookie)
+                if status != 200:
+                    errors.append(status)
+                    continue
+                timings.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(client_loop(cookie) for cookie in cookies))
+        return timings, errors
+
+    def _report(self, title, result, duration):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{title}'))
+        timings = sorted(result['timings'])
+        self.stdout.write(
+            f'  запросов в секунду: {len(timings) / duration:.0f}'
+        )
+        if timings:
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f'  задержка: медиана {statistics.median(timings):.1f} мс, '
+                f'p95 {p95:.1f} мс'
+            )
+        if result['errors']:
+            self.stdout.write(
+                f'  ответов с ошибкой: {len(result["errors"])} '
+                f'(коды {sorted(set(result["errors"]))})'
+            )
+        self.stdout.write(f'  потоков процесса: {result["threads"]}')
+        self.stdout.write(
+            f'  память: {result["rss"] / 2 ** 20:.0f} МБ до замера, '
+            f'прирост {result["rss_growth"] / 2 ** 20:.1f} МБ'
+        )
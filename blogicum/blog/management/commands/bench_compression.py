@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from blog.benchmarks import benchmark_database, measure, seed_posts
+from blog.compression import ENCODINGS, compress, make_encoder
+from blog.models import Post
+
+# уровни для сравнения: быстрые, по умолчанию и максимальные
+LEVELS = {
+    'gzip': (1, 6, 9),
+    'br': (1, 4, 5, 11),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает процессорное время сжатия gzip и brotli на разных '
+        'уровнях с экономией байтов на настоящих страницах блога.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз сжимать каждую страницу.'
+        )
+        parser.add_argument(
+            '--comments', type=int, default=20,
+            help='Сколько комментариев у публикации на её странице.'
+        )
+
+    def handle(self, *args, repeat, comments, **options):
+        with benchmark_database():
+            seed_posts(200, comments_per_post=comments)
+            pages = self._pages()
+        for title, content in pages:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\n{title}: {len(content)} байт'
+            ))
+            for encoding in ENCODINGS:
+                for level in LEVELS[encoding]:
+                    self._report(content, encoding, level, repeat)
+
+    def _pages(self):
+        # страницы отдаются без сжатия: сжимает сама команда
+        client = Client(HTTP_HOST='localhost')
+        post = Post.objects.filter(is_visible=True).order_by('pk').first()
+        urls = (
+            ('Главная', '/'),
+            ('Категория', f'/category/{post.category.slug}/'),
+            ('Публикация с комментариями', f'/posts/{post.pk}/'),
+            ('Профиль', f'/profile/{post.author.username}/'),
+        )
+        return [(title, client.get(url).content) for title, url in urls]
+
+    def _report(self, content, encoding, level, repeat):
+        def run():
+            return compress(content, make_encoder(encoding, level))
+
+        elapsed = measure(run, repeat, clock=time.process_time)
+        size = len(run())
+        saved = 100 * (1 - size / len(content))
+        throughput = len(content) / 1024 / 1024 / (elapsed / 1000 or 1e-9)
+        self.stdout.write(
+            f'  {encoding}-{level}: {size} байт (-{saved:.1f}%), '
+            f'{elapsed:.3f} мс CPU, {throughput:.0f} МБ/с'
+        )
@@ -0,0 +1,186 @@
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test import Client
+
+from blog.backends.sqlite_pool.base import POOL_OPTIONS
+from blog.backends.sqlite_pool.pool import close_pool
+from blog.benchmarks import benchmark_database, seed_posts
+from blog.models import Post
+
+User = get_user_model()
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+# без настроек профиля: журнал отката, соединение на каждый запрос
+BASELINE = {
+    'ENGINE': SQLITE_ENGINE,
+    'CONN_MAX_AGE': 0,
+    'CONN_HEALTH_CHECKS': False,
+    'OPTIONS': {},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает базу параллельными чтениями лент и добавлением '
+        'комментариев. SQLite замеряется с настройками по умолчанию, с '
+        'рабочим профилем (WAL, busy_timeout, постоянные соединения, '
+        'IMMEDIATE) и с ним же через пул соединений с очередью записи, '
+        'PostgreSQL - с рабочим профилем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Сколько клиентов работает одновременно.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Сколько секунд длится каждый замер.'
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля запросов, добавляющих комментарий.'
+        )
+
+    def handle(self, *args, threads, duration, write_ratio, **options):
+        # ошибки базы считаются, трассировки каждой не нужны
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        if connection.vendor != 'sqlite':
+            with benchmark_database():
+                users, post_ids = self._seed(threads)
+                self._run(
+                    f'{connection.display_name}, рабочий профиль',
+                    users, post_ids, duration, write_ratio,
+                )
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            with benchmark_database(
+                test_name=os.path.join(directory, 'bench.sqlite3')
+            ):
+                users, post_ids = self._seed(threads)
+                self._compare_sqlite_profiles(
+                    users, post_ids, duration, write_ratio
+                )
+
+    def _seed(self, threads):
+        seed_posts(2000)
+        users = User.objects.bulk_create(
+            User(username=f'bench_reader_{i}') for i in range(threads)
+        )
+        post_ids = list(
+            Post.objects.filter(is_visible=True).values_list(
+                'pk', flat=True
+            )[:100]
+        )
+        return users, post_ids
+
+    def _compare_sqlite_profiles(self, users, post_ids, duration, write_ratio):
+        settings_dict = connection.settings_dict
+        pooled = {key: settings_dict[key] for key in BASELINE}
+        tuned = {
+            **pooled,
+            'ENGINE': SQLITE_ENGINE,
+            'OPTIONS': {
+                name: value for name, value in pooled['OPTIONS'].items()
+                if name not in POOL_OPTIONS
+            },
+        }
+        for title, profile in (
+            ('Настройки по умолчанию', BASELINE),
+            ('Рабочий профиль', tuned),
+            ('Рабочий профиль с пулом', pooled),
+        ):
+            # потоки замера создают соединения с движком профиля
+            settings_dict.update(profile)
+            # режим журнала хранится в самом файле базы, а сменить его
+            # можно, только когда других соединений нет
+            connections.close_all()
+            close_pool(settings_dict['NAME'])
+            with closing(sqlite3.connect(settings_dict['NAME'])) as database:
+                database.execute(
+                    'PRAGMA journal_mode=%s' % (
+                        'WAL' if profile['OPTIONS'] else 'DELETE'
+                    )
+                )
+            self._run(title, users, post_ids, duration, write_ratio)
+        settings_dict.update(pooled)
+
+    def _run(self, title, users, post_ids, duration, write_ratio):
+        results = []
+        deadline = time.perf_counter() + duration
+        workers = [
+            threading.Thread(
+                target=self._client_loop,
+                args=(user, post_ids, deadline, write_ratio, results),
+            )
+            for user in users
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{title}'))
+        total = sum(len(timings) for kind, timings, errors in results)
+        self.stdout.write(f'  запросов в секунду: {total / duration:.0f}')
+        for kind in ('чтение', 'запись'):
+            timings = [
+                timing for result_kind, kind_timings, _ in results
+                if result_kind == kind for timing in kind_timings
+            ]
+            errors = sum(
+                kind_errors for result_kind, _, kind_errors in results
+                if result_kind == kind
+            )
+            if not timings:
+                self.stdout.write(f'  {kind}: нет успешных запросов')
+                continue
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f'  {kind}: {len(timings)} запросов, медиана '
+                f'{statistics.median(timings):.1f} мс, p95 {p95:.1f} мс, '
+                f'ошибок базы: {errors}'
+            )
+
+    def _client_loop(self, user, post_ids, deadline, write_ratio, results):
+        rng = random.Random(user.pk)
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        timings = {'чтение': [], 'запись': []}
+        errors = {'чтение': 0, 'запись': 0}
+        try:
+            while time.perf_counter() < deadline:
+                post_id = rng.choice(post_ids)
+                kind = 'запись' if rng.random() < write_ratio else 'чтение'
+                started = time.perf_counter()
+                try:
+                    if kind == 'запись':
+                        client.post(
+                            f'/posts/{post_id}/add_comment/',
+                            {'text': 'Комментарий под нагрузкой'},
+                        )
+                    elif rng.random() < 0.5:
+                        client.get('/')
+                    else:
+                        client.get(f'/posts/{post_id}/')
+                except OperationalError:
+                    errors[kind] += 1
+                    continue
+                timings[kind].append((time.perf_counter() - started) * 1000)
+        finally:
+            connections.close_all()
+        results.extend(
+            (kind, timings[kind], errors[kind]) for kind in timings
+        )
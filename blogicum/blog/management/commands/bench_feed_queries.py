@@ -0,0 +1,138 @@
+from django.core.paginator import Paginator
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blog.benchmarks import (
+    analyze, benchmark_database, index_definitions, measure, parse_sizes,
+    seed_posts
+)
+from blog.constants import POSTS_PER_PAGE
+from blog.models import Category, Comment, Post
+from blog.paginators import CursorPaginator
+from blog.utils import get_published_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет запросы лент на 10k/100k/1M публикаций с индексами лент '
+        'и без них и печатает их план выполнения (EXPLAIN). Работает с '
+        'SQLite и PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=parse_sizes, default='10000,100000,1000000',
+            help='Количества публикаций через запятую.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторять каждый запрос.'
+        )
+        parser.add_argument(
+            '--no-explain', action='store_false', dest='explain',
+            help='Не печатать планы запросов.'
+        )
+
+    def handle(self, *args, sizes, repeat, explain, **options):
+        with benchmark_database():
+            for size in sorted(sizes):
+                seed_posts(size, comments_per_post=0)
+                self._seed_comments()
+                analyze()
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'\n=== {size} публикаций ==='
+                ))
+                for with_indexes in (False, True):
+                    if not with_indexes:
+                        self._toggle_indexes(create=False)
+                    self.stdout.write(self.style.MIGRATE_LABEL(
+                        'С индексами лент' if with_indexes
+                        else 'Без индексов лент'
+                    ))
+                    for title, queryset in self._scenarios():
+                        self._report(title, queryset, repeat, explain)
+                    if not with_indexes:
+                        self._toggle_indexes(create=True)
+
+    def _seed_comments(self):
+        # комментарии нужны только одной публикации, на которой
+        # замеряется выборка обсуждения
+        post = Post.objects.order_by('pk').first()
+        if not post.comments.exists():
+            Comment.objects.bulk_create(
+                Comment(post=post, author=post.author, text='Комментарий')
+                for _ in range(1000)
+            )
+
+    def _scenarios(self):
+        feed = get_published_posts(Post.objects)
+        paginator = CursorPaginator(feed, POSTS_PER_PAGE)
+        middle = feed.order_by('-pub_date', '-pk')[
+            feed.count() // 2:feed.count() // 2 + 1
+        ].get()
+        category = Category.objects.filter(is_published=True).first()
+        post = Post.objects.order_by('pk').first()
+        author = post.author
+
+        def first_page(queryset):
+            return CursorPaginator(queryset, POSTS_PER_PAGE).page_queryset()
+
+        deep_cursor = paginator.cursor_for(middle)
+        # так выбиралась та же страница до перехода на курсоры
+        offset_page = Paginator(
+            feed.order_by('-pub_date'), POSTS_PER_PAGE
+        ).get_page(feed.count() // 2 // POSTS_PER_PAGE)
+
+        return (
+            ('Главная, первая страница', first_page(feed)),
+            (
+                'Главная, курсор на середине ленты',
+                paginator.page_queryset(deep_cursor),
+            ),
+            (
+                f'Главная, OFFSET стр. {offset_page.number}',
+                offset_page.object_list,
+            ),
+            (
+                'Категория, первая страница',
+                first_page(get_published_posts(category.posts)),
+            ),
+            (
+                'Профиль (гость), первая страница',
+                first_page(get_published_posts(author.posts)),
+            ),
+            (
+                'Профиль (автор), первая страница',
+                first_page(author.posts.all()),
+            ),
+            (
+                'Комментарии к публикации',
+                post.comments.filter(is_published=True).order_by(
+                    'created_at'
+                ),
+            ),
+        )
+
+    def _toggle_indexes(self, create):
+        with connection.cursor() as cursor:
+            if create:
+                for sql in self._index_sql.values():
+                    cursor.execute(sql)
+            else:
+                self._index_sql = index_definitions(
+                    index.name
+                    for model in (Post, Comment)
+                    for index in model._meta.indexes
+                )
+                for name in self._index_sql:
+                    cursor.execute(
+                        'DROP INDEX %s' % connection.ops.quote_name(name)
+                    )
+        analyze()
+
+    def _report(self, title, queryset, repeat, explain):
+        elapsed = measure(lambda: list(queryset.all()), repeat)
+        self.stdout.write(f'  {title}: {elapsed:.2f} мс')
+        if explain:
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f'      {line}')
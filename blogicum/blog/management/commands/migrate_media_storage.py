@@ -0,0 +1,107 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from blog.images import FORMATS
+from blog.models import Post
+from blog.storage import HASHED_NAME_RE, is_hashed_name
+from blog.utils import iterate_in_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит изображения публикаций, сохранённые до появления '
+        'хранилища по содержимому, в каталоги ab/cd/<хэш> и обновляет '
+        'пути в базе порциями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько публикаций переносить в одной транзакции.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько публикаций нужно перенести.'
+        )
+
+    def handle(self, *args, chunk_size, dry_run, **options):
+        posts = Post.objects.exclude(
+            Q(image='') | Q(image__isnull=True)
+            | Q(image__regex=HASHED_NAME_RE.pattern)
+        )
+        if dry_run:
+            self.stdout.write(
+                f'Публикаций с изображениями для переноса: {posts.count()}'
+            )
+            return
+        storage = Post._meta.get_field('image').storage
+        moved = missing = 0
+        for chunk in iterate_in_chunks(
+            posts.only('image', 'image_renditions'), chunk_size
+        ):
+            legacy = set()
+            updated = []
+            with transaction.atomic():
+                for post in chunk:
+                    if not storage.exists(post.image.name):
+                        missing += 1
+                        continue
+                    names = self.legacy_names(post)
+                    if not all(storage.exists(name) for name in names):
+                        # версии пересоздаст backfill_renditions
+                        post.image_renditions = {}
+                        names = {post.image.name}
+                    renamed = {
+                        name: self.adopt(storage, name) for name in names
+                    }
+                    post.image.name = renamed[post.image.name]
+                    post.image_renditions = self.rewrite_renditions(
+                        post.image_renditions, renamed
+                    )
+                    legacy |= names
+                    updated.append(post)
+                Post.objects.bulk_update(
+                    updated, ('image', 'image_renditions')
+                )
+            # прежние файлы удаляются только после фиксации путей; один
+            # оригинал мог достаться нескольким публикациям (фикстуры)
+            still_used = set(
+                Post.objects.filter(image__in=legacy).values_list(
+                    'image', flat=True
+                )
+            )
+            for name in legacy - still_used:
+                storage.delete_legacy(name)
+            moved += len(updated)
+            self.stdout.write(f'Перенесено публикаций: {moved}')
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'Пропущено публикаций с отсутствующими файлами: {missing}'
+            ))
+        self.stdout.write(self.style.SUCCESS('Готово.'))
+
+    def legacy_names(self, post):
+        names = {post.image.name}
+        data = post.image_renditions or {}
+        if data.get('source') == post.image.name:
+            for info in data.get('renditions', {}).values():
+                names.update(info[format_name] for format_name in FORMATS)
+        return {name for name in names if not is_hashed_name(name)}
+
+    def adopt(self, storage, name):
+        with storage.open(name, 'rb') as legacy:
+            return storage.save(name, legacy)
+
+    def rewrite_renditions(self, data, renamed):
+        if not data:
+            return data
+        data = {**data, 'source': renamed.get(data['source'], data['source'])}
+        data['renditions'] = {
+            rendition: {
+                key: renamed.get(value, value) if key in FORMATS else value
+                for key, value in info.items()
+            }
+            for rendition, info in data.get('renditions', {}).items()
+        }
+        return data
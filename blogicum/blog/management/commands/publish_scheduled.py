@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from blog.scheduling import next_publication_time, publish_due_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Включает отложенные публикации, время которых наступило. '
+        'С --loop работает постоянно и просыпается к ближайшей публикации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать следующих публикаций.'
+        )
+        parser.add_argument(
+            '--max-interval', type=float, default=60,
+            help='Максимальная пауза между проверками в секундах: за это '
+                 'время подхватываются публикации, отложенные после '
+                 'запуска команды.'
+        )
+
+    def handle(self, *args, loop, max_interval, **options):
+        while True:
+            published = publish_due_posts()
+            if published:
+                self.stdout.write(
+                    f'{timezone.now():%Y-%m-%d %H:%M:%S} '
+                    f'включено публикаций: {published}'
+                )
+            if not loop:
+                return
+            time.sleep(self._pause(max_interval))
+            close_old_connections()
+
+    def _pause(self, max_interval):
+        next_time = next_publication_time()
+        if next_time is None:
+            return max_interval
+        until_next = (next_time - timezone.now()).total_seconds()
+        return min(max(until_next, 0), max_interval)
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from blog import fts
+from blog.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовый индекс публикаций и комментариев. '
+        'Работает порциями по pk, каждая порция - в своей короткой '
+        'транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Сколько записей индексировать за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help=(
+                'Перестроить индекс одной транзакцией. Исправляет и '
+                'записи, изменённые, пока триггеров индекса не было, '
+                'но на всё время перестроения блокирует запись в базу.'
+            )
+        )
+
+    def handle(self, *args, chunk_size, full, **options):
+        if not fts.is_supported(connection):
+            raise CommandError('Поиск поддерживается только для SQLite.')
+        fts.create_schema(connection)
+        if full:
+            with transaction.atomic():
+                fts.rebuild(connection)
+            self.stdout.write(self.style.SUCCESS('Индекс перестроен.'))
+            return
+        for model, table in (
+            (Post, fts.POST_FTS_TABLE),
+            (Comment, fts.COMMENT_FTS_TABLE),
+        ):
+            bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+            if bounds['low'] is None:
+                continue
+            for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+                # остальные записи тем временем поддерживают триггеры
+                with transaction.atomic():
+                    fts.reindex(connection, table, start, start + chunk_size)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: проиндексировано.'
+            )
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен.'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет сохранённое количество комментариев у публикаций с '
+        'фактическим и исправляет расхождения. Работает порциями по pk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько публикаций обрабатывать за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать расхождения, ничего не изменяя.'
+        )
+
+    def handle(self, *args, chunk_size, dry_run, **options):
+        bounds = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write('Публикаций нет.')
+            return
+
+        fixed = 0
+        for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+            chunk = Post.objects.filter(
+                pk__gte=start, pk__lt=start + chunk_size
+            )
+            with transaction.atomic():
+                stale = chunk.with_stale_comment_count()
+                if dry_run:
+                    fixed += stale.count()
+                else:
+                    fixed += stale.update_comment_count()
+
+        verb = 'Найдено' if dry_run else 'Исправлено'
+        self.stdout.write(
+            self.style.SUCCESS(f'{verb} расхождений: {fixed}.')
+        )
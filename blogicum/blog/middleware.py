@@ -0,0 +1,155 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import compression
+from .cache import READ_YOUR_WRITES_COOKIE
+from .compression import (
+    acompress_stream, choose_encoding, compress, compress_stream,
+    is_compressible, make_encoder
+)
+from .routers import arecord_write, record_write
+
+
+class ReadYourWritesMiddleware:
+    """Помечает браузер, который только что изменил данные.
+
+    Пока кука жива, закэшированные страницы ему не отдаются, а чтение
+    идёт из основной базы, а не из реплик: после отправки формы
+    пользователь сразу видит результат своих действий.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.is_write(request, response):
+            if settings.BLOG_DATABASE_REPLICAS:
+                record_write()
+            self.mark(response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.is_write(request, response):
+            if settings.BLOG_DATABASE_REPLICAS:
+                await arecord_write()
+            self.mark(response)
+        return response
+
+    def is_write(self, request, response):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') and (
+            response.status_code < 400
+        )
+
+    def mark(self, response):
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            '1',
+            max_age=settings.BLOG_READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite='Lax',
+        )
+
+
+class CompressionMiddleware:
+    """Сжимает текстовые ответы brotli (если установлен) или gzip.
+
+    Ответы меньше ``BLOG_COMPRESS_MIN_SIZE`` байт, уже сжатые
+    (``Content-Encoding``) и форматы, которые сжимать бесполезно
+    (изображения), отдаются как есть. Потоковые ответы сжимаются по
+    частям. Страницы с CSRF-токеном сжимаются только gzip: дополнение
+    его заголовка случайной длины защищает токен от атаки BREACH, а у
+    brotli такого нет. Сильный ETag становится слабым: тело ответа уже не
+    совпадает байт в байт, но ``If-None-Match`` сравнивает ETag без
+    учёта ``W/``, поэтому условные запросы по-прежнему дают 304.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        # сжатие страницы занимает доли миллисекунды, отдельный поток
+        # для него не нужен
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        if not self.should_compress(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encodings = None
+        if self.carries_csrf_token(request, response):
+            # у brotli нет случайного дополнения против BREACH, как у gzip
+            encodings = tuple(
+                encoding for encoding in compression.ENCODINGS
+                if encoding != 'br'
+            )
+        encoding = choose_encoding(
+            request.headers.get('Accept-Encoding'), encodings
+        )
+        if encoding is None:
+            return response
+        encoder = make_encoder(
+            encoding,
+            settings.BLOG_BROTLI_QUALITY if encoding == 'br'
+            else settings.BLOG_GZIP_LEVEL,
+            settings.BLOG_COMPRESS_RANDOM_BYTES,
+        )
+        if response.streaming:
+            stream = (
+                acompress_stream if response.is_async else compress_stream
+            )
+            response.streaming_content = stream(
+                response.streaming_content, encoder
+            )
+            del response.headers['Content-Length']
+        else:
+            content = compress(response.content, encoder)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def carries_csrf_token(self, request, response):
+        # get_token() отмечает запрос, когда токен попал в страницу
+        return (
+            request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            or settings.CSRF_COOKIE_NAME in response.cookies
+        )
+
+    def should_compress(self, response):
+        if response.status_code in (204, 206, 304):
+            return False
+        if response.has_header('Content-Encoding'):
+            return False
+        if not is_compressible(response.get('Content-Type')):
+            return False
+        if response.streaming:
+            # размер известен, например, у FileResponse
+            size = response.get('Content-Length')
+        else:
+            size = len(response.content)
+        return size is None or int(size) >= settings.BLOG_COMPRESS_MIN_SIZE
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_comment_count(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    actual = Coalesce(
+        Subquery(
+            Comment.objects.filter(
+                post=OuterRef('pk'), is_published=True
+            ).order_by().values('post').annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+    last_pk = Post.objects.aggregate(models.Max('pk'))['pk__max'] or 0
+    for start in range(0, last_pk + 1, BACKFILL_CHUNK_SIZE):
+        Post.objects.filter(
+            pk__gte=start, pk__lt=start + BACKFILL_CHUNK_SIZE
+        ).update(comment_count=actual)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_alter_comment_options_remove_comment_pub_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(
+            backfill_comment_count, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BACKFILL_CHUNK_SIZE = 1000
+
+# копии blog.utils на момент миграции: миграция не должна меняться
+# вместе с кодом приложения
+EXCERPT_WORDS = 10
+READING_WORDS_PER_MINUTE = 200
+
+
+def make_excerpt(text):
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
+
+def estimate_reading_time(text):
+    return max(1, round(len(text.split()) / READING_WORDS_PER_MINUTE))
+
+
+def backfill_excerpt(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    last_pk = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                'text'
+            )[:BACKFILL_CHUNK_SIZE]
+        )
+        if not posts:
+            break
+        for post in posts:
+            post.excerpt = make_excerpt(post.text)
+            post.reading_time = estimate_reading_time(post.text)
+        Post.objects.bulk_update(posts, ('excerpt', 'reading_time'))
+        last_pk = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_is_visible'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(
+                blank=True, editable=False, verbose_name='Начало текста'
+            ),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(
+                default=1, editable=False, verbose_name='Время чтения, мин'
+            ),
+        ),
+        migrations.RunPython(backfill_excerpt, migrations.RunPython.noop),
+    ]
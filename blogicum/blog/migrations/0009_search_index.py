@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from blog import fts
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    fts.create_schema(connection)
+    if fts.is_supported(connection):
+        with connection.cursor() as cursor:
+            for table in (fts.POST_FTS_TABLE, fts.COMMENT_FTS_TABLE):
+                cursor.execute(
+                    f"INSERT INTO {table}({table}) VALUES ('rebuild')"
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    fts.drop_schema(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_excerpt_reading_time'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
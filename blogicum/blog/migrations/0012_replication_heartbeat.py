@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplicationHeartbeat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('beat', models.DateTimeField(verbose_name='Последняя запись')),
+            ],
+            options={
+                'verbose_name': 'отметка репликации',
+                'verbose_name_plural': 'Отметки репликации',
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+
+
+# В PostgreSQL индексы лент дополняются столбцами INCLUDE, а индекс
+# отложенных публикаций сужается условием: нужные запросам значения
+# читаются из индекса без обращения к таблице (Index Only Scan). Имена
+# индексов те же, поэтому состояние моделей не меняется, а в SQLite
+# миграция ничего не делает.
+COVERING_INDEXES = {
+    'post': (
+        # гостевой профиль и число публикаций автора
+        models.Index(
+            fields=['author', 'pub_date', 'id'],
+            include=['is_visible'],
+            name='post_author_feed_idx',
+        ),
+        # publish_scheduled проверяет категорию без чтения публикаций
+        models.Index(
+            fields=['pub_date'],
+            condition=models.Q(is_visible=False, is_published=True),
+            include=['category'],
+            name='post_scheduled_idx',
+        ),
+    ),
+    'comment': (
+        # страницы комментариев и пересчёт comment_count
+        models.Index(
+            fields=['post', 'created_at', 'id'],
+            include=['is_published'],
+            name='comment_post_created_idx',
+        ),
+    ),
+}
+
+
+def replace_indexes(apps, schema_editor, forward):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, covering_indexes in COVERING_INDEXES.items():
+        model = apps.get_model('blog', model_name)
+        indexes = {index.name: index for index in model._meta.indexes}
+        for covering in covering_indexes:
+            plain = indexes[covering.name]
+            old, new = (plain, covering) if forward else (covering, plain)
+            schema_editor.remove_index(model, old)
+            schema_editor.add_index(model, new)
+
+
+def create_covering_indexes(apps, schema_editor):
+    replace_indexes(apps, schema_editor, forward=True)
+
+
+def restore_plain_indexes(apps, schema_editor):
+    replace_indexes(apps, schema_editor, forward=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_replication_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_covering_indexes, restore_plain_indexes),
+    ]
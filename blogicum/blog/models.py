@@ -1,8 +1,14 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Case, Count, F, OuterRef, Q, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from .constants import FIELD_MAX_LENGTH
+from .storage import ContentAddressedStorage
+from .utils import estimate_reading_time, make_excerpt
 
 User = get_user_model()
 
@@ -54,6 +60,60 @@ class Location(PublishedModel):
         return self.name
 
 
+class PostQuerySet(models.QuerySet):
+    def _actual_comment_count(self):
+        return Coalesce(
+            Subquery(
+                Comment.objects.filter(
+                    post=OuterRef('pk'), is_published=True
+                ).order_by().values('post').annotate(
+                    total=Count('pk')
+                ).values('total')
+            ),
+            0
+        )
+
+    def with_stale_comment_count(self):
+        return self.alias(
+            actual_comment_count=self._actual_comment_count()
+        ).exclude(comment_count=F('actual_comment_count'))
+
+    def update_comment_count(self):
+        """Пересчитывает comment_count одним UPDATE по подзапросу."""
+        return self.update(comment_count=self._actual_comment_count())
+
+    def due(self, now=None):
+        """Отложенные публикации, время которых уже наступило."""
+        return self.filter(
+            is_visible=False,
+            is_published=True,
+            category__is_published=True,
+            pub_date__lte=now or timezone.now(),
+        )
+
+    def scheduled(self, now=None):
+        return self.filter(
+            is_visible=False,
+            is_published=True,
+            category__is_published=True,
+            pub_date__gt=now or timezone.now(),
+        )
+
+    def set_category_is_published(self, is_published, now=None):
+        """Пересчитывает is_visible после смены видимости категории."""
+        if is_published:
+            is_visible = Case(
+                When(
+                    is_published=True,
+                    pub_date__lte=now or timezone.now(),
+                    then=Value(True),
+                ),
+                default=Value(False),
+            )
+            return self.filter(is_visible=False).update(is_visible=is_visible)
+        return self.filter(is_visible=True).update(is_visible=False)
+
+
 class Post(PublishedModel):
     title = models.CharField(
         'Заголовок', max_length=FIELD_MAX_LENGTH, blank=False
@@ -85,19 +145,86 @@ class Post(PublishedModel):
     )
     image = models.ImageField(
         upload_to='post_images/',
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True,
         verbose_name='Изображение'
     )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+    # is_published публикации и её категории и наступившая дата публикации
+    # одним флагом: ленты фильтруются без JOIN категории и без сравнения
+    # pub_date с текущим временем, а отложенные публикации включает
+    # команда publish_scheduled
+    is_visible = models.BooleanField(
+        'Видна в лентах', default=False, editable=False
+    )
+    # размеры оригинала и уменьшенные версии изображения, см. blog.images
+    image_renditions = models.JSONField(
+        'Версии изображения', default=dict, blank=True, editable=False
+    )
+    # считаются при сохранении, чтобы ленты не читали полный текст
+    excerpt = models.TextField('Начало текста', blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(
+        'Время чтения, мин', default=1, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
+        # ленты обходятся по (pub_date, id) в обратном порядке, индексы
+        # по возрастанию SQLite и PostgreSQL умеют читать с конца
+        indexes = (
+            models.Index(
+                fields=('pub_date', 'id'),
+                condition=Q(is_visible=True),
+                name='post_visible_feed_idx',
+            ),
+            models.Index(
+                fields=('category', 'pub_date', 'id'),
+                condition=Q(is_visible=True),
+                name='post_visible_category_feed_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date', 'id'),
+                name='post_author_feed_idx',
+            ),
+            models.Index(
+                fields=('pub_date',),
+                condition=Q(is_visible=False),
+                name='post_scheduled_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    def compute_is_visible(self):
+        return (
+            self.is_published
+            and self.pub_date is not None
+            and self.pub_date <= timezone.now()
+            and Category.objects.filter(
+                pk=self.category_id, is_published=True
+            ).exists()
+        )
+
+    def save(self, *args, **kwargs):
+        self.is_visible = self.compute_is_visible()
+        if 'text' not in self.get_deferred_fields():
+            self.excerpt = make_excerpt(self.text)
+            self.reading_time = estimate_reading_time(self.text)
+        if self.image_renditions.get('source') != (
+            self.image.name if self.image else None
+        ):
+            # версии прежнего изображения освобождает сигнал
+            self.image_renditions = {}
+        super().save(*args, **kwargs)
+
 
 class Comment(PublishedModel):
     post = models.ForeignKey(
@@ -125,6 +252,49 @@ class Comment(PublishedModel):
         ordering = ('-created_at',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at', 'id'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text
+
+    def save(self, *args, **kwargs):
+        # счётчик обновляется в той же транзакции, что и сам комментарий
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Post.objects.filter(pk=self.post_id).update_comment_count()
+
+
+class StoredFile(models.Model):
+    """Счётчик ссылок на файл в ContentAddressedStorage."""
+
+    name = models.CharField('Путь в хранилище', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Количество ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return self.name
+
+
+class ReplicationHeartbeat(models.Model):
+    """Время последней записи через сайт на основной базе.
+
+    Запись реплицируется вместе с данными: разница между значением на
+    основной базе и на реплике - её отставание.
+    """
+
+    beat = models.DateTimeField('Последняя запись')
+
+    class Meta:
+        verbose_name = 'отметка репликации'
+        verbose_name_plural = 'Отметки репликации'
+
+    def __str__(self):
+        return str(self.beat)
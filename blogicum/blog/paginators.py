@@ -0,0 +1,400 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import DateField, F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(value, pk, backwards=False):
+    """Упаковывает позицию в ленте в непрозрачную строку для URL.
+
+    Значение - дата и время либо число (например, релевантность).
+    """
+    payload = [
+        value.isoformat() if isinstance(value, datetime) else value,
+        pk,
+        int(backwards),
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk, backwards = json.loads(raw)
+        if isinstance(value, str):
+            value = parse_datetime(value)
+            if value is None:
+                raise ValueError(cursor)
+        elif value is not None and not isinstance(value, (int, float)):
+            raise ValueError(cursor)
+        return value, int(pk), bool(backwards)
+    except (binascii.Error, TypeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+class CursorPage(Sequence):
+    """Страница ленты, полученная по курсору, а не по номеру страницы."""
+
+    cursor_based = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self.paginator.cursor_for(
+            self.object_list[0], backwards=True
+        )
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (field, pk).
+
+    Вместо OFFSET следующая страница выбирается условием
+    «строго после последней показанной записи», поэтому стоимость
+    запроса не зависит от глубины страницы.
+    """
+
+    page_class = CursorPage
+
+    def __init__(self, queryset, per_page, field='pub_date', descending=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.field = field
+        self.descending = descending
+        model_field = queryset.model._meta.get_field(field)
+        self.nullable = model_field.null
+        self.temporal = isinstance(model_field, DateField)
+
+    def cursor_for(self, obj, backwards=False):
+        return encode_cursor(getattr(obj, self.field), obj.pk, backwards)
+
+    def _ordering(self, reverse):
+        descending = self.descending != reverse
+        if descending:
+            return (
+                F(self.field).desc(nulls_last=True),
+                F('pk').desc(),
+            )
+        return (
+            F(self.field).asc(nulls_first=True),
+            F('pk').asc(),
+        )
+
+    def _segments(self, position, reverse):
+        """Запросы, которые по очереди выдают записи после позиции.
+
+        Записи без значения поля считаются самыми старыми и выбираются
+        отдельным запросом: так условие по заполненным значениям
+        остаётся диапазоном ``field <= value`` и читается по индексу.
+        """
+        descending = self.descending != reverse
+        field = self.field
+        direction = 'lt' if descending else 'gt'
+        filled = self.queryset
+        empty = None
+        if self.nullable:
+            filled = filled.filter(**{f'{field}__isnull': False})
+            empty = self.queryset.filter(
+                **{f'{field}__isnull': True}
+            ).order_by(F('pk').desc() if descending else F('pk').asc())
+        filled = filled.order_by(*self._ordering(reverse))
+
+        if position is None:
+            segments = [filled, empty] if descending else [empty, filled]
+        else:
+            value, pk = position
+            if value is None:
+                if empty is None:
+                    raise InvalidCursor(position)
+                empty = empty.filter(**{f'pk__{direction}': pk})
+                segments = [empty] if descending else [empty, filled]
+            else:
+                filled = filled.filter(
+                    Q(**{f'{field}__{direction}e': value}),
+                    Q(**{f'{field}__{direction}': value})
+                    | Q(**{f'pk__{direction}': pk}),
+                )
+                segments = [filled, empty] if descending else [filled]
+        return [segment for segment in segments if segment is not None]
+
+    def _parse(self, cursor):
+        if not cursor:
+            return None, False
+        value, pk, backwards = decode_cursor(cursor)
+        if value is not None and self.temporal != isinstance(value, datetime):
+            raise InvalidCursor(cursor)
+        return (value, pk), backwards
+
+    def page_queryset(self, cursor=None):
+        """Основной запрос, которым выбирается страница по курсору."""
+        return self._segments(*self._parse(cursor))[0][:self.per_page + 1]
+
+    def page(self, cursor=None):
+        """Возвращает страницу после курсора (или первую страницу)."""
+        return self._page(*self._parse(cursor))
+
+    async def apage(self, cursor=None):
+        """Асинхронный вариант ``page``."""
+        position, reverse = self._parse(cursor)
+        wanted = self.per_page + 1
+        rows = []
+        for segment in self._segments(position, reverse):
+            rows.extend([row async for row in segment[:wanted - len(rows)]])
+            if len(rows) == wanted:
+                break
+        return self._build_page(rows, position, reverse)
+
+    def _page(self, position, reverse):
+        # лишняя запись говорит о том, что дальше есть ещё страница
+        wanted = self.per_page + 1
+        rows = []
+        for segment in self._segments(position, reverse):
+            rows.extend(segment[:wanted - len(rows)])
+            if len(rows) == wanted:
+                break
+        return self._build_page(rows, position, reverse)
+
+    def _build_page(self, rows, position, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            return self.page_class(
+                rows, self, has_next=True, has_previous=has_more
+            )
+        return self.page_class(
+            rows, self, has_next=has_more, has_previous=position is not None
+        )
+
+    def _offset_queryset(self, offset):
+        queryset = self.queryset.order_by(*self._ordering(reverse=False))
+        return queryset[offset:offset + self.per_page + 1]
+
+    def _build_offset_page(self, rows, offset):
+        has_more = len(rows) > self.per_page
+        return self.page_class(
+            rows[:self.per_page], self,
+            has_next=has_more, has_previous=offset > 0
+        )
+
+    def page_at_offset(self, offset):
+        """Страница по смещению для старых ссылок вида ``?page=N``."""
+        rows = list(self._offset_queryset(offset))
+        if not rows and offset:
+            return self.page()
+        return self._build_offset_page(rows, offset)
+
+    async def apage_at_offset(self, offset):
+        """Асинхронный вариант ``page_at_offset``."""
+        rows = [row async for row in self._offset_queryset(offset)]
+        if not rows and offset:
+            return await self.apage()
+        return self._build_offset_page(rows, offset)
+
+
+class CountFreePage(Page):
+    """Страница, которая знает о следующей странице без COUNT(*)."""
+
+    cursor_based = False
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    @cached_property
+    def elided_page_range(self):
+        return list(self.paginator.get_elided_page_range(
+            self.number, on_each_side=2, on_ends=1
+        ))
+
+
+class CountFreePaginator(Paginator):
+    """Постраничный вывод по номерам без точного COUNT(*) на каждый запрос.
+
+    Общее количество берётся из кэша (``count_cache_key``) и уточняется
+    по факту, когда пользователь доходит до последней страницы; наличие
+    следующей страницы определяется по лишней (per_page + 1) записи.
+    """
+
+    count_cache_timeout = 60
+
+    def __init__(self, object_list, per_page, count_cache_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_cache_key = count_cache_key
+
+    @cached_property
+    def count(self):
+        if self.count_cache_key is None:
+            return super().count
+        count = cache.get(self.count_cache_key)
+        if count is None:
+            count = super().count
+            cache.set(self.count_cache_key, count, self.count_cache_timeout)
+        return count
+
+    async def acount(self):
+        """Загружает ``count`` асинхронно, чтобы шаблон не ходил в базу."""
+        if 'count' in self.__dict__:
+            return self.count
+        count = None
+        if self.count_cache_key is not None:
+            count = await cache.aget(self.count_cache_key)
+        if count is None:
+            count = await self.object_list.acount()
+            if self.count_cache_key is not None:
+                await cache.aset(
+                    self.count_cache_key, count, self.count_cache_timeout
+                )
+        self.__dict__['count'] = count
+        return count
+
+    def _set_count(self, count):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+
+    def _correct_count(self, count):
+        self._set_count(count)
+        if self.count_cache_key is not None:
+            cache.set(self.count_cache_key, count, self.count_cache_timeout)
+
+    async def _acorrect_count(self, count):
+        self._set_count(count)
+        if self.count_cache_key is not None:
+            await cache.aset(
+                self.count_cache_key, count, self.count_cache_timeout
+            )
+
+    def validate_number(self, number):
+        # верхнюю границу не проверяем: сохранённый count может отставать
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            pass
+        try:
+            return self.page(max(self.num_pages, 1))
+        except EmptyPage:
+            return self.page(1)
+
+    async def aget_page(self, number):
+        """Асинхронный вариант ``get_page``."""
+        await self.acount()
+        try:
+            return await self.apage(number)
+        except PageNotAnInteger:
+            return await self.apage(1)
+        except EmptyPage:
+            pass
+        try:
+            return await self.apage(max(self.num_pages, 1))
+        except EmptyPage:
+            return await self.apage(1)
+
+    def _rows(self, number):
+        bottom = (number - 1) * self.per_page
+        return self.object_list[bottom:bottom + self.per_page + 1]
+
+    def _build_page(self, rows, number):
+        """Страница из выбранных строк и уточнённый count (или None).
+
+        Если строк на странице нет, вместо страницы возвращается None,
+        а вместо count - True, когда сохранённый count завышен и его
+        нужно пересчитать.
+        """
+        bottom = (number - 1) * self.per_page
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows and number > 1:
+            return None, self.count > bottom or None
+
+        seen = bottom + len(rows)
+        count = None
+        if not has_next and self.count != seen:
+            count = seen
+        elif has_next and self.count <= seen:
+            count = seen + 1
+        return CountFreePage(rows, number, self, has_next), count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        page, count = self._build_page(list(self._rows(number)), number)
+        if count is True:
+            # по завышенному count get_page() снова попала бы мимо
+            # последней страницы, поэтому count считается точно
+            count = self.object_list.count()
+        if count is not None:
+            self._correct_count(count)
+        if page is None:
+            raise EmptyPage(self.error_messages['no_results'])
+        return page
+
+    async def apage(self, number):
+        """Асинхронный вариант ``page``."""
+        number = self.validate_number(number)
+        rows = [row async for row in self._rows(number)]
+        await self.acount()
+        page, count = self._build_page(rows, number)
+        if count is True:
+            count = await self.object_list.acount()
+        if count is not None:
+            await self._acorrect_count(count)
+        if page is None:
+            raise EmptyPage(self.error_messages['no_results'])
+        return page
@@ -0,0 +1,173 @@
+"""Чтение с реплик базы данных.
+
+Ленты и страницы публикаций и профилей, обёрнутые в
+``read_from_replica``, читают с реплик из ``BLOG_DATABASE_REPLICAS``;
+всё остальное, включая любую запись, идёт в основную базу. Браузер,
+который недавно что-то изменил (кука ``ReadYourWritesMiddleware``),
+читает из основной базы и сразу видит свои изменения.
+
+Реплика, отставшая больше чем на ``BLOG_REPLICA_MAX_LAG`` секунд или
+недоступная, пропускается до следующей проверки - тогда читается
+основная база. Отставание проверяется не чаще раза в
+``BLOG_REPLICA_CHECK_INTERVAL`` секунд по ``ReplicationHeartbeat``.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils import timezone
+
+from .cache import recently_wrote
+from .models import ReplicationHeartbeat
+
+logger = logging.getLogger(__name__)
+
+# сессия нужна сразу после входа, реплика могла её ещё не получить
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_health = {}
+_health_lock = threading.Lock()
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_from_replica(view):
+    """Выполняет представление с чтением из реплик.
+
+    Отправка форм и запросы браузера, который недавно что-то изменил,
+    читают из основной базы. Асинхронным представлениям флаг виден и в
+    потоках, где выполняются их запросы к базе: ``sync_to_async``
+    копирует контекст.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or recently_wrote(request)
+            ):
+                return await view(request, *args, **kwargs)
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or recently_wrote(request)
+        ):
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def record_write():
+    """Обновляет отметку последней записи на основной базе."""
+    ReplicationHeartbeat.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        pk=1, defaults={'beat': timezone.now()}
+    )
+
+
+async def arecord_write():
+    await ReplicationHeartbeat.objects.using(
+        DEFAULT_DB_ALIAS
+    ).aupdate_or_create(pk=1, defaults={'beat': timezone.now()})
+
+
+def replication_lag(alias):
+    """Отставание реплики ``alias`` в секундах."""
+    def beat(using):
+        return ReplicationHeartbeat.objects.using(using).values_list(
+            'beat', flat=True
+        ).first()
+
+    primary = beat(DEFAULT_DB_ALIAS)
+    if primary is None:
+        # через сайт ещё ничего не записывали
+        return 0.0
+    replica = beat(alias)
+    if replica is None:
+        return float('inf')
+    return max((primary - replica).total_seconds(), 0.0)
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and (
+        now - checked_at < settings.BLOG_REPLICA_CHECK_INTERVAL
+    ):
+        return healthy
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, False))
+        if checked_at is not None and (
+            now - checked_at < settings.BLOG_REPLICA_CHECK_INTERVAL
+        ):
+            return healthy
+        try:
+            lag = replication_lag(alias)
+        except DatabaseError:
+            logger.warning('Реплика %s недоступна', alias, exc_info=True)
+            healthy = False
+        else:
+            healthy = lag <= settings.BLOG_REPLICA_MAX_LAG
+            if not healthy:
+                logger.warning(
+                    'Реплика %s отстаёт на %.1f с', alias, lag
+                )
+        _health[alias] = (now, healthy)
+        return healthy
+
+
+def healthy_replicas():
+    return [
+        alias for alias in settings.BLOG_DATABASE_REPLICAS
+        if is_healthy(alias)
+    ]
+
+
+class ReplicaRouter:
+    """Чтение с реплик внутри ``read_from_replica``, запись в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            not _replica_reads.get()
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+        ):
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.BLOG_DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # схема попадает на реплики вместе с данными
+        if db in settings.BLOG_DATABASE_REPLICAS:
+            return False
+        return None
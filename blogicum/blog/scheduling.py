@@ -0,0 +1,36 @@
+"""Включение отложенных публикаций в момент их pub_date."""
+from django.utils import timezone
+
+from .cache import bump_generations_on_commit, post_scopes
+from .models import Post
+
+
+def publish_due_posts(now=None):
+    """Делает видимыми публикации, время которых наступило.
+
+    Возвращает количество включённых публикаций.
+    """
+    now = now or timezone.now()
+    due = list(
+        Post.objects.due(now).select_related('category').only(
+            'pk', 'author_id', 'category__slug'
+        )
+    )
+    if not due:
+        return 0
+    Post.objects.filter(
+        pk__in=[post.pk for post in due], is_visible=False
+    ).update(is_visible=True)
+    scopes = set()
+    for post in due:
+        scopes.update(post_scopes(post))
+    bump_generations_on_commit(*scopes)
+    return len(due)
+
+
+def next_publication_time(now=None):
+    """Ближайшее время, когда появится отложенная публикация."""
+    post = Post.objects.scheduled(now).order_by('pub_date').only(
+        'pub_date'
+    ).first()
+    return post.pub_date if post else None
@@ -0,0 +1,187 @@
+"""Поиск по публикациям и комментариям с ранжированием bm25."""
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import fts
+from .models import Post
+from .paginators import CursorPage, InvalidCursor, decode_cursor, encode_cursor
+from .utils import get_published_posts
+
+# совпадение в заголовке важнее совпадения в тексте
+TITLE_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+SNIPPET_TOKENS = 16
+# маркеры подсветки заменяются на <mark> уже после экранирования текста
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+# совпадения ранжируются только по bm25; snippet() дорог и считается
+# потом, лишь для попавших на страницу записей
+POST_HITS_SQL = f"""
+    SELECT rowid,
+           bm25({fts.POST_FTS_TABLE}, {TITLE_WEIGHT}, {TEXT_WEIGHT}),
+           'post', rowid
+    FROM {fts.POST_FTS_TABLE}
+    WHERE {fts.POST_FTS_TABLE} MATCH %s
+"""
+
+COMMENT_HITS_SQL = f"""
+    SELECT comment.post_id,
+           bm25({fts.COMMENT_FTS_TABLE}),
+           'comment', comment.id
+    FROM {fts.COMMENT_FTS_TABLE}
+    JOIN blog_comment AS comment
+        ON comment.id = {fts.COMMENT_FTS_TABLE}.rowid
+    WHERE {fts.COMMENT_FTS_TABLE} MATCH %s AND comment.is_published
+"""
+
+# из всех совпадений публикации (в ней самой и в комментариях к ней)
+# берётся лучшее, видимость проверяется по тому же флагу, что и в лентах
+SEARCH_SQL = """
+    WITH hits(post_id, rank, source, hit_id) AS ({hits}),
+    best AS (
+        SELECT post_id, rank, source, hit_id, ROW_NUMBER() OVER (
+            PARTITION BY post_id ORDER BY rank
+        ) AS position
+        FROM hits
+    )
+    SELECT best.post_id, best.rank, best.source, best.hit_id
+    FROM best JOIN blog_post AS post ON post.id = best.post_id
+    WHERE best.position = 1 AND post.is_visible {after}
+    ORDER BY best.rank {direction}, best.post_id {direction}
+    LIMIT %s
+"""
+
+SNIPPET_SQL = {
+    'post': f"""
+        SELECT rowid,
+               snippet({fts.POST_FTS_TABLE}, -1, %s, %s, '…',
+                       {SNIPPET_TOKENS})
+        FROM {fts.POST_FTS_TABLE}
+        WHERE {fts.POST_FTS_TABLE} MATCH %s AND rowid IN ({{ids}})
+    """,
+    'comment': f"""
+        SELECT rowid,
+               snippet({fts.COMMENT_FTS_TABLE}, 0, %s, %s, '…',
+                       {SNIPPET_TOKENS})
+        FROM {fts.COMMENT_FTS_TABLE}
+        WHERE {fts.COMMENT_FTS_TABLE} MATCH %s AND rowid IN ({{ids}})
+    """,
+}
+
+
+def is_available():
+    return fts.is_supported(connection)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(MARK_START, '<mark>').replace(
+            MARK_END, '</mark>'
+        )
+    )
+
+
+class SearchPaginator:
+    """Keyset-пагинация результатов поиска по паре (rank, id).
+
+    Чем меньше bm25, тем выше результат. Ранги пересчитываются при
+    изменении индекса, поэтому курсор привязан к позиции в выдаче,
+    а не к конкретной публикации.
+    """
+
+    page_class = CursorPage
+
+    def __init__(self, query, per_page, with_comments=False):
+        self.match = fts.match_expression(query)
+        self.per_page = int(per_page)
+        self.with_comments = with_comments
+
+    def cursor_for(self, post, backwards=False):
+        return encode_cursor(post.search_rank, post.pk, backwards)
+
+    def _parse(self, cursor):
+        if not cursor:
+            return None, False
+        rank, pk, backwards = decode_cursor(cursor)
+        if not isinstance(rank, (int, float)):
+            raise InvalidCursor(cursor)
+        return (rank, pk), backwards
+
+    def _hits(self, position, reverse, limit):
+        hits = [POST_HITS_SQL]
+        params = [self.match]
+        if self.with_comments:
+            hits.append(COMMENT_HITS_SQL)
+            params.append(self.match)
+        after = ''
+        if position is not None:
+            sign = '<' if reverse else '>'
+            after = (
+                f'AND (best.rank {sign} %s '
+                f'OR (best.rank = %s AND best.post_id {sign} %s))'
+            )
+            rank, pk = position
+            params += [rank, rank, pk]
+        params.append(limit)
+        sql = SEARCH_SQL.format(
+            hits=' UNION ALL '.join(hits),
+            after=after,
+            direction='DESC' if reverse else 'ASC',
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _snippets(self, rows):
+        """Фрагменты с подсветкой для выбранных совпадений."""
+        ids = {}
+        for _, _, source, hit_id in rows:
+            ids.setdefault(source, []).append(hit_id)
+        snippets = {}
+        with connection.cursor() as cursor:
+            for source, hit_ids in ids.items():
+                cursor.execute(
+                    SNIPPET_SQL[source].format(
+                        ids=', '.join(['%s'] * len(hit_ids))
+                    ),
+                    [MARK_START, MARK_END, self.match, *hit_ids],
+                )
+                snippets.update(
+                    ((source, hit_id), snippet)
+                    for hit_id, snippet in cursor.fetchall()
+                )
+        return snippets
+
+    def page(self, cursor=None):
+        """Страница результатов после курсора (или первая страница)."""
+        position, reverse = self._parse(cursor)
+        if not self.match:
+            return self.page_class([], self, False, False)
+        rows = self._hits(position, reverse, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+        posts = get_published_posts(Post.objects).defer('text').in_bulk(
+            [post_id for post_id, _, _, _ in rows]
+        )
+        snippets = self._snippets(rows)
+        results = []
+        for post_id, rank, source, hit_id in rows:
+            post = posts.get(post_id)
+            if post is not None:
+                post.search_rank = rank
+                post.search_snippet = highlight(
+                    snippets.get((source, hit_id), '')
+                )
+                results.append(post)
+        if reverse:
+            return self.page_class(
+                results, self, has_next=True, has_previous=has_more
+            )
+        return self.page_class(
+            results, self,
+            has_next=has_more, has_previous=position is not None
+        )
@@ -0,0 +1,235 @@
+"""Отдача медиафайлов и статики с диска.
+
+В рабочем окружении передачу файла лучше отдать фронтовому серверу:
+``BLOG_MEDIA_ACCEL = 'x-accel-redirect'`` для nginx (внутренний
+``location`` с префиксом ``BLOG_MEDIA_ACCEL_PREFIX``) или
+``'x-sendfile'`` для Apache и lighttpd - тогда Django только проверяет
+путь и заголовки условного запроса. Без этого файл отдаётся
+``FileResponse``: WSGI-сервер с ``wsgi.file_wrapper`` (gunicorn,
+uWSGI) передаёт его через sendfile, не копируя в память процесса,
+а запросы ``Range`` обслуживаются частичным ответом.
+
+Статику отдаёт само приложение (отдельный сервер статики на одной
+машине не нужен): сжатые при ``collectstatic`` копии выбираются по
+``Accept-Encoding``.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .compression import (
+    ENCODINGS, EXTENSIONS, accepted_encodings, is_compressible
+)
+from .storage import is_hashed_name
+
+# файлы с хэшем содержимого в имени никогда не меняются
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Часть открытого файла для ``FileResponse``.
+
+    ``read()`` не выходит за конец диапазона, а ``fileno()`` позволяет
+    серверу отправить диапазон через sendfile по ``Content-Length``.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Диапазон ``(start, length)`` из заголовка ``Range``.
+
+    Несколько диапазонов сразу не поддерживаются - на такой запрос
+    отдаётся весь файл, как разрешает RFC 9110. Для диапазона за
+    пределами файла возвращается ``ValueError``.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500 - последние 500 байт
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def range_applies(request, etag, last_modified):
+    # If-Range: часть отдаётся, только если у клиента та же версия файла
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def file_etag(path, stat):
+    if is_hashed_name(path):
+        return '"%s"' % posixpath.splitext(posixpath.basename(path))[0]
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def serve_file(
+    request, full_path, path, content_type=None, headers=None,
+    immutable=False, accel=None, root=None,
+):
+    """Ответ с файлом ``full_path``; ``path`` - его имя в URL.
+
+    Учитывает ``If-None-Match``, ``If-Modified-Since`` и ``Range``.
+    """
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Файл не найден.')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден.')
+    etag = file_etag(path, stat)
+    last_modified = int(stat.st_mtime)
+    if content_type is None:
+        content_type, _ = mimetypes.guess_type(full_path)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = file_body(
+            request, full_path, stat, etag, last_modified,
+            content_type or 'application/octet-stream', accel, root,
+        )
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    for header, value in (headers or {}).items():
+        response.headers[header] = value
+    if immutable:
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.BLOG_MEDIA_MAX_AGE
+        )
+    return response
+
+
+def file_body(
+    request, full_path, stat, etag, last_modified, content_type, accel, root
+):
+    if accel == 'x-accel-redirect':
+        # Range и передачу файла обслуживает nginx
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Accel-Redirect'] = (
+            settings.BLOG_MEDIA_ACCEL_PREFIX
+            + quote(os.path.relpath(full_path, root))
+        )
+        return response
+    if accel == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Sendfile'] = full_path
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if 'Range' in request.headers and range_applies(
+        request, etag, last_modified
+    ):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(
+            FileRange(file, start, length), content_type=content_type,
+            status=206,
+        )
+        response.headers['Content-Length'] = length
+        response.headers['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def resolve(root, path):
+    try:
+        return safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден.')
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдаёт файл из ``MEDIA_ROOT``."""
+    return serve_file(
+        request, resolve(settings.MEDIA_ROOT, path), path,
+        immutable=is_hashed_name(path),
+        accel=settings.BLOG_MEDIA_ACCEL, root=settings.MEDIA_ROOT,
+    )
+
+
+@require_safe
+def serve_static(request, path):
+    """Отдаёт собранную статику из ``STATIC_ROOT``.
+
+    Если клиент принимает brotli или gzip и ``collectstatic`` сохранил
+    сжатую копию, отдаётся она. Файлы с хэшем в имени кэшируются
+    навсегда.
+    """
+    full_path = resolve(settings.STATIC_ROOT, path)
+    content_type, _ = mimetypes.guess_type(full_path)
+    headers = {}
+    if is_compressible(content_type):
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+        for encoding in ENCODINGS:
+            compressed = full_path + EXTENSIONS[encoding]
+            if encoding in accepted and os.path.isfile(compressed):
+                full_path = compressed
+                headers['Content-Encoding'] = encoding
+                break
+    response = serve_file(
+        request, full_path, path, content_type=content_type,
+        headers=headers, immutable=path in staticfiles_storage.hashed_names,
+    )
+    if is_compressible(content_type):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
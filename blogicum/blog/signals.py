@@ -0,0 +1,276 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import fts, workers
+from .autocomplete import index as autocomplete_index
+from .cache import SITE, bump_generations_on_commit, post_scopes
+from .images import generate_post_renditions, image_files, release_files
+from .models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+
+# публикации, чьи комментарии удаляются каскадом в текущем потоке
+_cascade = threading.local()
+
+
+def _deleted_with_parent(origin):
+    # комментарии удаляются каскадом вместе с публикацией или автором
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not Comment
+
+
+def _cascade_post_ids():
+    if not hasattr(_cascade, 'post_ids'):
+        _cascade.post_ids = set()
+    return _cascade.post_ids
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance, origin=None, **kwargs):
+    # удаление (в том числе каскадное) выполняется внутри транзакции
+    # Collector, поэтому счётчик меняется атомарно вместе с ним
+    if _deleted_with_parent(origin):
+        # пересчёт один на публикацию в finish_comment_cascade
+        _cascade_post_ids().add(instance.post_id)
+        return
+    Post.objects.filter(pk=instance.post_id).update_comment_count()
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=User)
+def finish_comment_cascade(sender, **kwargs):
+    """Пересчитывает публикации после каскадного удаления комментариев.
+
+    Collector удаляет комментарии раньше публикаций и пользователей,
+    поэтому к первому post_delete родителя все они уже удалены.
+    Публикации, удалённые вместе с комментариями, не пересчитываются.
+    """
+    post_ids = _cascade_post_ids()
+    if not post_ids:
+        return
+    _cascade.post_ids = set()
+    posts = list(
+        Post.objects.select_related('category').only(
+            'author_id', 'category__slug'
+        ).filter(pk__in=post_ids)
+    )
+    if not posts:
+        return
+    Post.objects.filter(
+        pk__in=[post.pk for post in posts]
+    ).update_comment_count()
+    bump_generations_on_commit(
+        *(scope for post in posts for scope in post_scopes(post))
+    )
+
+
+@receiver(post_save, sender=Category)
+def sync_category_visibility(sender, instance, **kwargs):
+    # одним UPDATE и только там, где значение действительно меняется
+    Post.objects.filter(category=instance).set_category_is_published(
+        instance.is_published
+    )
+
+
+@receiver(pre_delete, sender=Category)
+def hide_posts_of_deleted_category(sender, instance, **kwargs):
+    # публикации без категории в ленты не попадают
+    instance.posts.set_category_is_published(False)
+
+
+@receiver(post_save, sender=Post)
+def sync_loaded_post_visibility(sender, instance, raw, **kwargs):
+    # loaddata сохраняет публикации в обход Post.save
+    if raw:
+        Post.objects.filter(pk=instance.pk).update(
+            is_visible=instance.compute_is_visible()
+        )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_scopes(sender, instance, raw, **kwargs):
+    # при смене автора или категории устаревают и прежние страницы
+    instance._previous_scopes = ()
+    instance._previous_image = (None, None)
+    # новый файл ещё не сохранён: хранилище само учтёт ссылку на него
+    instance._image_uploaded = (
+        bool(instance.image) and not instance.image._committed
+    )
+    if raw or instance.pk is None:
+        return
+    previous = Post.objects.select_related('category').only(
+        'author_id', 'category__slug', 'image', 'image_renditions'
+    ).filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._previous_scopes = post_scopes(previous)
+        instance._previous_image = (
+            previous.image.name, previous.image_renditions
+        )
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    bump_generations_on_commit(
+        *post_scopes(instance), *getattr(instance, '_previous_scopes', ())
+    )
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_pages(sender, instance, **kwargs):
+    bump_generations_on_commit(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, origin=None, **kwargs):
+    if _deleted_with_parent(origin):
+        # страницы сбросит finish_comment_cascade
+        return
+    # счётчик комментариев виден в карточках всех лент
+    post = Post.objects.select_related('category').only(
+        'author_id', 'category__slug'
+    ).filter(pk=instance.post_id).first()
+    if post is not None:
+        bump_generations_on_commit(*post_scopes(post))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_site_pages(sender, **kwargs):
+    # названия категорий и мест выводятся в карточках на всех страницах
+    bump_generations_on_commit(SITE)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_pages_of_deleted_user(sender, **kwargs):
+    bump_generations_on_commit(SITE)
+
+
+@receiver(post_save, sender=User)
+def invalidate_pages_of_user(sender, created, update_fields, **kwargs):
+    # вход пользователя обновляет только last_login, а новый
+    # пользователь ещё нигде не упоминается
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    bump_generations_on_commit(SITE)
+
+
+def ensure_search_index(sender, using, **kwargs):
+    # миграции, пересоздающие таблицы блога, удаляют триггеры индекса
+    fts.create_schema(connections[using])
+
+
+def suggested_user(user):
+    if user is None or not user.is_active:
+        return None
+    return user.username
+
+
+@receiver(pre_save, sender=User)
+def remember_user_suggestion(sender, instance, raw, update_fields, **kwargs):
+    instance._previous_suggestion = None
+    if raw or instance.pk is None or update_fields == frozenset(
+        {'last_login'}
+    ):
+        return
+    previous = User.objects.filter(pk=instance.pk).only(
+        'username', 'is_active'
+    ).first()
+    instance._previous_suggestion = suggested_user(previous)
+
+
+@receiver(post_save, sender=User)
+def update_user_suggestions(sender, instance, created, update_fields,
+                            **kwargs):
+    if not created and update_fields == frozenset({'last_login'}):
+        return
+    old = getattr(instance, '_previous_suggestion', None)
+    new = suggested_user(instance)
+    # смена пароля и прочих полей имени не меняет
+    if old != new:
+        autocomplete_index.replace_user(old=old, new=new)
+
+
+@receiver(post_delete, sender=User)
+def remove_user_suggestions(sender, instance, **kwargs):
+    autocomplete_index.replace_user(old=suggested_user(instance))
+
+
+def suggested_category(category):
+    if category is None or not category.is_published:
+        return None
+    return category.slug, category.title
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_suggestion(sender, instance, raw, **kwargs):
+    previous = None
+    if not raw and instance.pk is not None:
+        previous = Category.objects.filter(pk=instance.pk).only(
+            'slug', 'title', 'is_published'
+        ).first()
+    instance._previous_suggestion = suggested_category(previous)
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestions(sender, instance, **kwargs):
+    autocomplete_index.replace_category(
+        old=getattr(instance, '_previous_suggestion', None),
+        new=suggested_category(instance),
+    )
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestions(sender, instance, **kwargs):
+    autocomplete_index.replace_category(old=suggested_category(instance))
+
+
+@receiver(post_save, sender=Post)
+def schedule_post_renditions(sender, instance, raw, **kwargs):
+    if raw or not instance.image:
+        return
+    if instance.image_renditions.get('source') != instance.image.name:
+        workers.submit_on_commit(generate_post_renditions, instance.pk)
+
+
+def release_post_image_on_commit(name, data):
+    storage = Post._meta.get_field('image').storage
+    files = image_files(name, data)
+    if files:
+        # после отката транзакции файлы остаются на месте
+        transaction.on_commit(lambda: release_files(storage, files))
+
+
+@receiver(post_save, sender=Post)
+def update_post_image_references(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    name, data = instance._previous_image
+    current = instance.image.name if instance.image else None
+    if current and current != name and not instance._image_uploaded:
+        # публикация ссылается на уже сохранённые файлы, например копия
+        storage = Post._meta.get_field('image').storage
+        for stored_name in image_files(current, instance.image_renditions):
+            storage.retain(stored_name)
+    if name and name != current:
+        release_post_image_on_commit(name, data)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_post_image(sender, instance, **kwargs):
+    if instance.image:
+        release_post_image_on_commit(
+            instance.image.name, instance.image_renditions
+        )
@@ -0,0 +1,66 @@
+"""Хранилище статики с хэшем содержимого в именах и сжатыми копиями.
+
+``collectstatic`` кладёт рядом с каждым файлом копию с хэшем в имени
+(``css/bootstrap.min.1a2b3c4d5e6f.css``), а для текстовых файлов ещё
+и ``.gz``, и ``.br`` (если установлен brotli). Сжатые копии отдаёт
+``blog.serving.serve_static`` по ``Accept-Encoding``.
+"""
+import mimetypes
+import os
+from functools import cached_property
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+from .compression import ENCODINGS, compress_file, is_compressible
+
+# сжатие файлов меньше этого размера экономит меньше заголовков ответа
+COMPRESS_MIN_SIZE = 512
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # карт исходников (.map) в проекте нет, а ссылка на отсутствующий
+    # файл прервала бы collectstatic
+    patterns = tuple(
+        (extension, tuple(
+            pattern for pattern in extension_patterns
+            if 'sourceMappingURL' not in str(pattern)
+        ))
+        for extension, extension_patterns in (
+            ManifestStaticFilesStorage.patterns
+        )
+    )
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic ещё не запускали (разработка, тесты)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            yield from self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        content_type, _ = mimetypes.guess_type(name)
+        if not is_compressible(content_type):
+            return
+        size = os.path.getsize(path)
+        if size < COMPRESS_MIN_SIZE:
+            return
+        for encoding in ENCODINGS:
+            compressed = compress_file(path, encoding)
+            if os.path.getsize(compressed) >= size:
+                # сжатие не помогло - отдаём исходный файл
+                os.remove(compressed)
+                continue
+            yield name, os.path.relpath(compressed, self.location), True
+
+    @cached_property
+    def hashed_names(self):
+        """Имена с хэшем из манифеста: их содержимое не меняется."""
+        return set(self.hashed_files.values())
@@ -0,0 +1,122 @@
+"""Хранилище медиафайлов, адресуемое по содержимому.
+
+Имя файла - SHA-256 его содержимого, разложенный по подкаталогам
+``ab/cd/`` из первых символов хэша: в одном каталоге не набирается
+миллионов файлов, а одинаковые загрузки хранятся один раз. Сколько
+раз файл сохранён, учитывается в ``StoredFile``; ``delete()`` лишь
+уменьшает счётчик и удаляет файл вместе с последней ссылкой.
+
+Файлы, сохранённые до появления хранилища (с обычными именами),
+счётчика не имеют, а один такой файл может достаться нескольким
+публикациям, поэтому ``delete()`` их не удаляет; перенести их помогает
+команда ``migrate_media_storage``.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+HASH_ALGORITHM = 'sha256'
+# без именованных групп: шаблон используется и в запросах __regex
+HASHED_NAME_RE = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$'
+)
+
+
+def file_digest(content):
+    digest = hashlib.new(HASH_ALGORITHM)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    """``post_images/photo.JPG`` -> ``post_images/ab/cd/abcd….jpg``."""
+    directory, filename = posixpath.split(name)
+    hashed = HASHED_NAME_RE.search(name)
+    if hashed:
+        # новое содержимое для файла из этого же хранилища
+        directory = name[:hashed.start()]
+    extension = posixpath.splitext(filename)[1].lower()
+    return posixpath.join(
+        directory, digest[:2], digest[2:4], f'{digest}{extension}'
+    )
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(name or ''))
+
+
+@deconstructible(path='blog.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        # каталог и расширение берутся из предложенного имени
+        name = hashed_name(self.generate_filename(name), file_digest(content))
+        with transaction.atomic():
+            self.retain(name)
+            if not self.exists(name):
+                self._save(name, content)
+        return name
+
+    def _save(self, name, content):
+        # файл пишется под временным именем и переименовывается, поэтому
+        # по адресу по содержимому никогда не лежит недописанный файл, а
+        # параллельная загрузка того же файла просто перезапишет его
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def retain(self, name):
+        """Добавляет ссылку на уже сохранённый файл."""
+        from .models import StoredFile
+
+        with transaction.atomic():
+            StoredFile.objects.get_or_create(name=name)
+            StoredFile.objects.filter(name=name).update(
+                references=F('references') + 1
+            )
+
+    def references(self, name):
+        from .models import StoredFile
+
+        return StoredFile.objects.filter(name=name).values_list(
+            'references', flat=True
+        ).first() or 0
+
+    def delete(self, name):
+        """Убирает одну ссылку; файл удаляется вместе с последней."""
+        from .models import StoredFile
+
+        if not is_hashed_name(name):
+            # ссылки на прежние файлы не учитывались
+            return
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(
+                name=name
+            ).first()
+            if stored is not None and stored.references > 1:
+                StoredFile.objects.filter(pk=stored.pk).update(
+                    references=F('references') - 1
+                )
+                return
+            if stored is not None:
+                stored.delete()
+            # внутри транзакции: параллельное сохранение того же файла
+            # дождётся её и запишет файл заново
+            super().delete(name)
+
+    def delete_legacy(self, name):
+        """Удаляет прежний файл, на который больше никто не ссылается."""
+        super().delete(name)
@@ -0,0 +1,13 @@
+from django import template
+
+from blog.images import picture
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(post, kind, css_class='', lazy=True):
+    """Изображение публикации с версиями под размер и плотность экрана."""
+    context = picture(post, kind)
+    context.update(css_class=css_class, lazy=lazy, alt=post.title)
+    return context
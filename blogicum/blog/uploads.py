@@ -0,0 +1,94 @@
+"""Приём изображений с ограничениями до их полного чтения.
+
+Файл принимается потоком: небольшие остаются в памяти, остальные
+пишутся во временный файл (``FILE_UPLOAD_MAX_MEMORY_SIZE``), а приём
+прерывается, как только файл превысил ``BLOG_UPLOAD_MAX_BYTES``.
+Размеры изображения проверяются по заголовку, без декодирования;
+поворот по EXIF и удаление метаданных выполняет фоновый пул
+(см. ``blog.images``).
+"""
+from django import forms
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+class BoundedUploadHandler(FileUploadHandler):
+    """Отбрасывает файл, как только он превысил допустимый размер.
+
+    Должен стоять первым в ``FILE_UPLOAD_HANDLERS``: он только считает
+    байты и передаёт данные следующим обработчикам.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.BLOG_UPLOAD_MAX_BYTES:
+            if not hasattr(self.request, 'oversized_uploads'):
+                self.request.oversized_uploads = set()
+            self.request.oversized_uploads.add(self.field_name)
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def oversized_uploads(request):
+    """Поля формы, файлы которых были отброшены из-за размера."""
+    return getattr(request, 'oversized_uploads', set())
+
+
+def size_error():
+    return forms.ValidationError(
+        'Файл слишком большой: допускается не больше %(limit)s.',
+        code='file_too_large',
+        params={'limit': filesizeformat(settings.BLOG_UPLOAD_MAX_BYTES)},
+    )
+
+
+class BoundedImageField(forms.ImageField):
+    """Поле изображения, которое читает только заголовок файла.
+
+    В отличие от ``forms.ImageField`` файл не проверяется целиком через
+    ``verify()``: формат и размеры в пикселях берутся из заголовка,
+    а повреждённые файлы отсеиваются при фоновой обработке.
+    """
+
+    def to_python(self, data):
+        upload = forms.FileField.to_python(self, data)
+        if upload is None:
+            return None
+        if upload.size > settings.BLOG_UPLOAD_MAX_BYTES:
+            raise size_error()
+        try:
+            # Image.open читает только заголовок файла
+            with Image.open(upload) as image:
+                image_format = image.format
+                width, height = image.size
+        except (OSError, Image.DecompressionBombError):
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image'
+            )
+        if image_format not in ALLOWED_FORMATS:
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image'
+            )
+        if width * height > settings.BLOG_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                'Изображение слишком большое: %(width)s×%(height)s '
+                'пикселей.',
+                code='too_many_pixels',
+                params={'width': width, 'height': height},
+            )
+        upload.content_type = Image.MIME.get(image_format)
+        upload.image_size = (width, height)
+        if hasattr(upload, 'seek') and callable(upload.seek):
+            upload.seek(0)
+        return upload
@@ -1,13 +1,20 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 app_name = 'blog'
 
+# главная, категории, публикации и профили могут быть асинхронными
+read_views = async_views if settings.BLOG_ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.index, name='index'),
+    path('', read_views.index, name='index'),
     path('posts/create/', views.create_post, name='create_post'),
-    path('posts/<int:id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:id>/', read_views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:id>/comments/', views.post_comments, name='post_comments'
+    ),
     path('posts/<int:id>/edit/', views.edit_post, name='edit_post'),
     path('posts/<int:id>/delete_post/', views.delete_post, name='delete_post'),
 
@@ -25,9 +32,11 @@ urlpatterns = [
 
     path(
         'category/<slug:category_slug>/',
-        views.category_posts,
+        read_views.category_posts,
         name='category_posts'
     ),
+    path('search/', views.search, name='search'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
     path('profile/edit_profile/', views.edit_profile, name='edit_profile'),
-    path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/', read_views.profile, name='profile'),
 ]
@@ -1,24 +1,118 @@
-from django.core.paginator import Paginator
-from django.db.models import Count
-from django.utils import timezone
-
-
-def get_published_posts(queryset, with_comments=False):
-    queryset = queryset.filter(
-        pub_date__lte=timezone.now(),
-        is_published=True,
-        category__is_published=True
-    ).select_related(
-        'category', 'author'
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model
+from django.utils.text import Truncator
+
+from .constants import EXCERPT_WORDS, READING_WORDS_PER_MINUTE
+from .paginators import CountFreePaginator, CursorPaginator, InvalidCursor
+
+
+def make_excerpt(text):
+    """Начало текста для карточек, как у фильтра truncatewords."""
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
+
+def estimate_reading_time(text):
+    """Время чтения текста в минутах, не меньше одной."""
+    return max(1, round(len(text.split()) / READING_WORDS_PER_MINUTE))
+
+
+def get_published_posts(queryset):
+    # is_visible учитывает и дату публикации, поэтому запрос не зависит
+    # от текущего времени и одинаков для всех запросов
+    return queryset.filter(is_visible=True).select_related(
+        'category', 'location', 'author'
     )
 
-    if with_comments:
-        queryset = queryset.annotate(comment_count=Count('comments'))
 
-    return queryset
+def iterate_in_chunks(queryset, chunk_size):
+    """Строки запроса списками до ``chunk_size`` штук по возрастанию pk.
+
+    В PostgreSQL строки читаются одним запросом через серверный курсор:
+    клиент получает их порциями и не держит в памяти всю выборку. В
+    SQLite серверных курсоров нет, а незавершённый запрос не даёт WAL
+    сбросить изменения в файл базы, поэтому каждая порция выбирается
+    отдельным запросом после pk предыдущей. У ``values_list()`` первым
+    должен идти pk.
+    """
+    queryset = queryset.order_by('pk')
+    if connections[queryset.db].vendor == 'postgresql':
+        rows = queryset.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            yield chunk
+        return
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk
+        )
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+        last_pk = last.pk if isinstance(last, Model) else last[0]
 
 
 def paginate_queryset(queryset, request, per_page):
-    paginator = Paginator(queryset, per_page)
+    """Постраничный вывод ленты.
+
+    Режим задаётся настройкой ``BLOG_PAGINATION_MODE``:
+
+    * ``cursor`` - переход по курсору ``?cursor=``; старые ссылки вида
+      ``?page=N`` продолжают работать, а ссылки с них ведут на курсоры;
+    * ``numbered`` - номера страниц с сокращённым списком ссылок и
+      закэшированным общим количеством записей.
+    """
+    if settings.BLOG_PAGINATION_MODE == 'numbered':
+        return paginate_by_number(queryset, request, per_page)
+
+    paginator = CursorPaginator(queryset, per_page)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            return paginator.page(cursor)
+        except InvalidCursor:
+            return paginator.page()
+    return paginator.page_at_offset(page_offset(request, per_page))
+
+
+async def apaginate_queryset(queryset, request, per_page):
+    """Асинхронный вариант ``paginate_queryset``."""
+    if settings.BLOG_PAGINATION_MODE == 'numbered':
+        paginator = CountFreePaginator(
+            queryset, per_page, count_cache_key=count_cache_key(request)
+        )
+        return await paginator.aget_page(request.GET.get('page'))
+
+    paginator = CursorPaginator(queryset, per_page)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            return await paginator.apage(cursor)
+        except InvalidCursor:
+            return await paginator.apage()
+    return await paginator.apage_at_offset(page_offset(request, per_page))
+
+
+def page_offset(request, per_page):
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    try:
+        page_number = max(int(page_number), 1)
+    except (TypeError, ValueError):
+        page_number = 1
+    return (page_number - 1) * per_page
+
+
+def count_cache_key(request):
+    # одна и та же лента у владельца профиля и у гостей различается
+    return 'blog:count:{}:{}'.format(request.path, request.user.pk or '')
+
+
+def paginate_by_number(queryset, request, per_page):
+    paginator = CountFreePaginator(
+        queryset, per_page, count_cache_key=count_cache_key(request)
+    )
+    return paginator.get_page(request.GET.get('page'))
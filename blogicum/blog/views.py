@@ -1,23 +1,41 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Count
-from django.http import Http404
+from django.db.models import Q
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
 
 from users.forms import UserEditForm
+from . import search as search_backend
+from .autocomplete import index as autocomplete_index
+from .cache import (
+    FEED, author_scope, cache_page_for_anonymous, category_scope,
+    conditional_page, post_scope
+)
 from .constants import POSTS_PER_PAGE
 from .forms import CommentForm, PostForm
+from .fragments import attach_post_cards, get_comment_page
 from .models import Category, Comment, Post
+from .paginators import InvalidCursor
+from .routers import read_from_replica
+from .uploads import oversized_uploads
 from .utils import get_published_posts, paginate_queryset
 
 
+@read_from_replica
+@conditional_page(lambda: (FEED,))
+@cache_page_for_anonymous(lambda: (FEED,))
 def index(request):
-    post_list = get_published_posts(Post.objects, with_comments=True).order_by(
+    post_list = get_published_posts(Post.objects).defer('text').order_by(
         '-pub_date'
     )
 
     page_obj = paginate_queryset(post_list, request, POSTS_PER_PAGE)
+    attach_post_cards(page_obj)
 
     context = {
         'page_obj': page_obj,
@@ -25,30 +43,81 @@ def index(request):
     return render(request, 'blog/index.html', context)
 
 
-def post_detail(request, id):
-    post = get_object_or_404(Post, pk=id)
-    comments = post.comments.order_by('created_at')
-    form = CommentForm()
-
-    if post.author != request.user:
-        # автор видит черновики постов, а остальные только опубликованные
-        # записи
-        if not get_published_posts(
-                Post.objects
-        ).filter(pk=post.pk).exists():
-            raise Http404()
-
-    context = {
+def visible_posts(request):
+    # автор видит черновики постов, а остальные только опубликованные
+    # записи; проверка видимости выполняется в том же запросе
+    visible = Q(is_visible=True)
+    if request.user.is_authenticated:
+        visible |= Q(author=request.user)
+    return Post.objects.filter(visible)
+
+
+def comments_context(request, post, comments_page):
+    """Страница комментариев и сколько их осталось после неё.
+
+    Остаток считается по сохранённому ``comment_count`` и числу уже
+    показанных комментариев из параметра ``shown``, без COUNT(*).
+    """
+    try:
+        shown = min(max(int(request.GET.get('shown', 0)), 0),
+                    post.comment_count)
+    except ValueError:
+        shown = 0
+    shown += len(comments_page.comments)
+    return {
         'post': post,
-        'comments': comments,
-        'form': form
+        'comments': comments_page.comments,
+        'next_cursor': comments_page.next_cursor,
+        'shown': shown,
+        'remaining': (
+            max(post.comment_count - shown, 0)
+            if comments_page.next_cursor else 0
+        ),
     }
+
+
+@read_from_replica
+@conditional_page(lambda id: (post_scope(id),))
+@cache_page_for_anonymous(lambda id: (post_scope(id),))
+def post_detail(request, id):
+    post = get_object_or_404(
+        visible_posts(request).select_related(
+            'author', 'category', 'location'
+        ),
+        pk=id
+    )
+    context = comments_context(
+        request, post, get_comment_page(post, request.GET.get('comments'))
+    )
+    context['form'] = CommentForm()
     return render(request, 'blog/detail.html', context)
 
 
+@conditional_page(lambda id: (post_scope(id),))
+def post_comments(request, id):
+    """Следующая страница комментариев для подгрузки на странице поста."""
+    post = get_object_or_404(
+        visible_posts(request).only('pk', 'comment_count'), pk=id
+    )
+    context = comments_context(
+        request, post, get_comment_page(post, request.GET.get('cursor'))
+    )
+    return JsonResponse({
+        'html': render_to_string(
+            'includes/comments.html', context, request=request
+        ),
+        'next_cursor': context['next_cursor'],
+        'remaining': context['remaining'],
+    })
+
+
 @login_required
 def create_post(request):
-    form = PostForm(request.POST or None, request.FILES or None)
+    form = PostForm(
+        request.POST or None,
+        request.FILES or None,
+        oversized_uploads=oversized_uploads(request),
+    )
     if request.method == 'POST' and form.is_valid():
         post = form.save(commit=False)
         if not post.pub_date:
@@ -69,7 +138,12 @@ def edit_post(request, id):
         return redirect('blog:post_detail', id=id)
 
     if request.method == 'POST':
-        form = PostForm(request.POST, request.FILES, instance=post)
+        form = PostForm(
+            request.POST,
+            request.FILES,
+            instance=post,
+            oversized_uploads=oversized_uploads(request),
+        )
         if form.is_valid():
             form.save()
             return redirect('blog:post_detail', id=id)
@@ -92,7 +166,7 @@ def delete_post(request, id):
 @login_required
 def add_comment(request, id):
     post = get_object_or_404(
-        get_published_posts(Post.objects, with_comments=True),
+        get_published_posts(Post.objects),
         pk=id
     )
     if request.method == 'POST':
@@ -148,6 +222,11 @@ def delete_comment(request, id, comment_id):
     return render(request, 'blog/comment.html', context)
 
 
+@read_from_replica
+@conditional_page(lambda category_slug: (category_scope(category_slug),))
+@cache_page_for_anonymous(
+    lambda category_slug: (category_scope(category_slug),)
+)
 def category_posts(request, category_slug):
     category = get_object_or_404(
         Category,
@@ -155,12 +234,12 @@ def category_posts(request, category_slug):
         is_published=True
     )
 
-    post_list = get_published_posts(
-        category.posts,
-        with_comments=True
-    ).order_by('-pub_date')
+    post_list = get_published_posts(category.posts).defer('text').order_by(
+        '-pub_date'
+    )
 
     page_obj = paginate_queryset(post_list, request, POSTS_PER_PAGE)
+    attach_post_cards(page_obj)
 
     context = {
         'category': category,
@@ -169,30 +248,90 @@ def category_posts(request, category_slug):
     return render(request, 'blog/category.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    with_comments = bool(request.GET.get('comments'))
+    context = {
+        'query': query,
+        'with_comments': with_comments,
+        'search_available': search_backend.is_available(),
+    }
+    if query and context['search_available']:
+        paginator = search_backend.SearchPaginator(
+            query, POSTS_PER_PAGE, with_comments=with_comments
+        )
+        try:
+            page_obj = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            page_obj = paginator.page()
+        attach_post_cards(page_obj)
+        params = {'q': query}
+        if with_comments:
+            params['comments'] = 1
+        context['page_obj'] = page_obj
+        # параметры поиска сохраняются в ссылках на другие страницы
+        context['page_query'] = urlencode(params) + '&'
+    return render(request, 'blog/search.html', context)
+
+
+def autocomplete(request):
+    """Подсказки авторов и категорий по началу имени, без запросов к базе."""
+    prefix = request.GET.get('q', '').strip()
+    users, categories = (
+        autocomplete_index.suggest(prefix) if prefix else ([], [])
+    )
+    return JsonResponse({
+        'users': [
+            {
+                'username': username,
+                'url': reverse('blog:profile', args=(username,)),
+            }
+            for username in users
+        ],
+        'categories': [
+            {
+                'slug': slug,
+                'title': title,
+                'url': reverse('blog:category_posts', args=(slug,)),
+            }
+            for slug, title in categories
+        ],
+    })
+
+
 def user_detail(request):
     return render(request, '')
 
 
-def profile(request, username):
-    profile = get_object_or_404(User, username=username)
+def profile_scopes(username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    return (author_scope(author_id),)
+
+
+def profile_posts(request, profile):
     if request.user == profile:
         # владелец профиля видит все свои записи включая черновики
-        post_list = Post.objects.filter(
-            author=profile
-        ).annotate(
-            comment_count=Count('comments')
-        ).order_by('-pub_date')
+        post_list = Post.objects.filter(author=profile)
     else:
         # гости профиля видят только опубликованные записи с учетом даты и
         # категории
-        post_list = Post.objects.filter(
-            author=profile,
-            is_published=True,
-            category__is_published=True,
-            pub_date__lte=timezone.now(),
-        ).annotate(comment_count=Count('comments')).order_by('-pub_date')
+        post_list = Post.objects.filter(author=profile, is_visible=True)
+    # в карточках нужно только начало текста, оно хранится в excerpt
+    return post_list.select_related(
+        'category', 'location', 'author'
+    ).defer('text').order_by('-pub_date')
 
-    page_obj = paginate_queryset(post_list, request, POSTS_PER_PAGE)
+
+@read_from_replica
+@conditional_page(profile_scopes)
+def profile(request, username):
+    profile = get_object_or_404(User, username=username)
+    page_obj = paginate_queryset(
+        profile_posts(request, profile), request, POSTS_PER_PAGE
+    )
+    attach_post_cards(page_obj)
 
     context = {
         'profile': profile,
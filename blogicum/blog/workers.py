@@ -0,0 +1,50 @@
+"""Пул фоновых потоков для тяжёлой обработки после ответа пользователю.
+
+Задачи ставятся после фиксации транзакции, чтобы поток видел
+сохранённые данные. При ``BLOG_WORKERS = 0`` задачи выполняются сразу
+в текущем потоке - так удобнее в тестах и командах.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BLOG_WORKERS,
+                thread_name_prefix='blog-worker',
+            )
+        return _executor
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s', func.__qualname__)
+    finally:
+        # у каждого потока пула своё соединение с базой
+        close_old_connections()
+
+
+def submit(func, *args):
+    """Выполняет ``func(*args)`` в пуле или сразу, если пул отключён."""
+    if not settings.BLOG_WORKERS:
+        func(*args)
+        return
+    _get_executor().submit(_run, func, args)
+
+
+def submit_on_commit(func, *args):
+    transaction.on_commit(lambda: submit(func, *args))
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,12 +52,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blog.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.ReadYourWritesMiddleware',
 ]
 
 
@@ -85,13 +88,108 @@ WSGI_APPLICATION = 'blogicum.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Настройки каждого нового соединения с SQLite:
+# - WAL: чтение не ждёт записи, запись не ждёт чтения;
+# - synchronous=NORMAL: в режиме WAL fsync только при checkpoint, после
+#   сбоя питания теряются последние транзакции, но не целостность базы;
+# - mmap_size: чтение страниц из отображённого в память файла без копий;
+# - cache_size: кэш страниц в КиБ (отрицательное значение);
+# - busy_timeout: сколько ждать блокировку записи, а не сразу получать
+#   "database is locked";
+# - temp_store: временные таблицы сортировок в памяти.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+# Соединений с базой на процесс: потоки сервера плюс фоновые потоки
+# BLOGICUM_WORKERS
+DB_POOL_SIZE = int(
+    os.environ.get('BLOGICUM_DB_POOL_SIZE', os.cpu_count() or 4)
+)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # читающие запросы идут через пул соединений, а запись - через
+        # одно соединение с очередью (см. blog/backends/sqlite_pool)
+        'ENGINE': 'blog.backends.sqlite_pool',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # соединение переиспользуется запросами одного потока и
+        # проверяется перед каждым запросом
+        'CONN_MAX_AGE': int(os.environ.get('BLOGICUM_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(
+                f'PRAGMA {name}={value}'
+                for name, value in SQLITE_PRAGMAS.items()
+            ),
+            # транзакция сразу берёт блокировку записи: без этого
+            # транзакция, начавшая с чтения, при первой записи получает
+            # "database is locked" без ожидания busy_timeout
+            'transaction_mode': 'IMMEDIATE',
+            'pool_size': DB_POOL_SIZE,
+            'write_queue_size': 64,
+            'write_timeout': 5,
+        },
     }
 }
 
+# Рабочий профиль PostgreSQL включается переменной BLOGICUM_POSTGRES_DB
+# (нужен pip install "psycopg[binary,pool]"). Соединения держит пул
+# psycopg, свой у каждого процесса сервера: всего соединений будет
+# max_size на число процессов, и это число должно укладываться в
+# max_connections сервера PostgreSQL.
+if os.environ.get('BLOGICUM_POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['BLOGICUM_POSTGRES_DB'],
+        'USER': os.environ.get('BLOGICUM_POSTGRES_USER', ''),
+        'PASSWORD': os.environ.get('BLOGICUM_POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('BLOGICUM_POSTGRES_HOST', ''),
+        'PORT': os.environ.get('BLOGICUM_POSTGRES_PORT', ''),
+        # соединения переиспользует пул, постоянные соединения Django
+        # с ним не используются
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': min(2, DB_POOL_SIZE),
+                'max_size': DB_POOL_SIZE,
+                # сколько секунд ждать свободное соединение
+                'timeout': 10,
+                # соединения переоткрываются, чтобы процессы сервера
+                # PostgreSQL не накапливали память
+                'max_lifetime': 30 * 60,
+            },
+        },
+    }
+
+# Реплики только для чтения: с них читают ленты и страницы публикаций
+# и профилей (blog/routers.py). Репликой может служить копия файла
+# SQLite, путь к которой задаёт BLOGICUM_REPLICA_NAME, база PostgreSQL с
+# этим именем на BLOGICUM_REPLICA_HOST или любая база, добавленная в
+# DATABASES и BLOG_DATABASE_REPLICAS.
+BLOG_DATABASE_REPLICAS = []
+if os.environ.get('BLOGICUM_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['BLOGICUM_REPLICA_NAME'],
+        'HOST': os.environ.get(
+            'BLOGICUM_REPLICA_HOST', DATABASES['default'].get('HOST', '')
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+    BLOG_DATABASE_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+# Реплика, отставшая больше чем на столько секунд, пропускается
+BLOG_REPLICA_MAX_LAG = 5
+# Как часто проверять отставание реплик
+BLOG_REPLICA_CHECK_INTERVAL = 2
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -132,11 +230,74 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# collectstatic собирает сюда файлы с хэшем в имени и их сжатые копии
+STATIC_ROOT = BASE_DIR / 'collected_static'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'blog.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Постраничный вывод лент: 'cursor' (по курсору) или 'numbered' (по номерам
+# страниц без точного COUNT(*) на каждый запрос)
+BLOG_PAGINATION_MODE = 'cursor'
+
+# Поколения кэша страниц должны быть общими для всех процессов сервера,
+# поэтому в продакшене задаётся адрес Redis
+if os.environ.get('BLOGICUM_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['BLOGICUM_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Сколько секунд анонимным читателям отдаётся закэшированная страница
+BLOG_PAGE_CACHE_TIMEOUT = 300
+# Фрагменты версионированы поколениями и могут жить долго
+BLOG_FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+# Сколько секунд после отправки формы браузер получает страницы в обход
+# кэша и читает из основной базы, а не из реплик
+BLOG_READ_YOUR_WRITES_SECONDS = int(
+    os.environ.get('BLOGICUM_READ_YOUR_WRITES_SECONDS', 10)
+)
+
+# Асинхронные представления лент и страниц публикаций и профилей
+# (blog.async_views) для ASGI-сервера. По умолчанию выключены: по замерам
+# bench_asgi синхронные представления быстрее и под ASGI
+BLOG_ASYNC_VIEWS = os.environ.get('BLOGICUM_ASYNC_VIEWS') == '1'
+
+# Загрузки больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во временный файл,
+# а приём файла больше BLOG_UPLOAD_MAX_BYTES прерывается
+FILE_UPLOAD_HANDLERS = [
+    'blog.uploads.BoundedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+BLOG_UPLOAD_MAX_BYTES = 25 * 1024 * 1024
+# Ограничение по заголовку изображения: декодированный кадр в 40 Мп
+# занимает около 120 МБ памяти
+BLOG_IMAGE_MAX_PIXELS = 40_000_000
+
+# Потоки для фоновой обработки изображений; 0 - обрабатывать сразу
+BLOG_WORKERS = int(os.environ.get('BLOGICUM_WORKERS', 2))
+
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 
 LOGIN_REDIRECT_URL = '/'
@@ -144,6 +305,21 @@ LOGIN_URL = '/auth/login/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# кто передаёт медиафайлы: 'x-accel-redirect' (nginx, внутренний location
+# с префиксом BLOG_MEDIA_ACCEL_PREFIX), 'x-sendfile' (Apache, lighttpd)
+# или None - сам Django
+BLOG_MEDIA_ACCEL = os.environ.get('BLOGICUM_MEDIA_ACCEL') or None
+BLOG_MEDIA_ACCEL_PREFIX = '/internal-media/'
+# для файлов без хэша содержимого в имени
+BLOG_MEDIA_MAX_AGE = 24 * 60 * 60
+
+# сжатие ответов (blog.middleware.CompressionMiddleware); меньшие ответы
+# не сжимаются: выигрыш меньше стоимости сжатия
+BLOG_COMPRESS_MIN_SIZE = 1024
+BLOG_GZIP_LEVEL = 6
+BLOG_BROTLI_QUALITY = 5
+# случайное дополнение заголовка gzip против атаки BREACH
+BLOG_COMPRESS_RANDOM_BYTES = 100
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
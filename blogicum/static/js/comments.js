@@ -0,0 +1,26 @@
+// Подгрузка следующих страниц комментариев без перезагрузки страницы.
+// Без JavaScript ссылка «Показать ещё» открывает страницу поста
+// со следующей страницей комментариев.
+document.addEventListener('click', async (event) => {
+  const link = event.target.closest('[data-more-comments]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  link.classList.add('disabled');
+  try {
+    const response = await fetch(link.dataset.url, {
+      headers: {Accept: 'application/json'},
+      credentials: 'same-origin',
+    });
+    if (!response.ok) {
+      throw new Error(response.statusText);
+    }
+    const data = await response.json();
+    // ответ содержит следующие комментарии и новую ссылку «Показать ещё»
+    link.insertAdjacentHTML('beforebegin', data.html);
+    link.remove();
+  } catch (error) {
+    window.location.href = link.href;
+  }
+});
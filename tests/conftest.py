@@ -19,6 +19,7 @@ from typing import (
 import pytest
 from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db.models import Model, Field
 from django.forms import BaseForm
 from django.http import HttpResponse
@@ -41,6 +42,19 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # кэш в памяти живёт дольше тестовой базы
+    cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def synchronous_workers(settings):
+    # фоновые задачи выполняются сразу, в потоке теста
+    settings.BLOG_WORKERS = 0
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -363,7 +377,14 @@ def cleanup(request):
                     filename.endswith(".jpg")
                     or filename.endswith(".gif")
                     or filename.endswith(".png")
+                    or filename.endswith(".webp")
             ):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
                     os.remove(file_path)
+
+    # каталоги хранилища по содержимому (post_images/ab/cd/)
+    for root, dirs, files in os.walk(image_dir, topdown=False):
+        depth = len(Path(root).relative_to(image_dir).parts)
+        if depth >= 2 and not os.listdir(root):
+            os.rmdir(root)
@@ -0,0 +1,105 @@
+import asyncio
+import gzip
+
+import pytest
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from blog.benchmarks import async_views
+from blog.cache import READ_YOUR_WRITES_COOKIE
+from blog.middleware import CompressionMiddleware, ReadYourWritesMiddleware
+
+pytestmark = [pytest.mark.django_db]
+
+BODY = "<p>текст</p>" * 500
+
+
+@pytest.fixture
+def urls(many_posts_with_published_locations):
+    post = many_posts_with_published_locations[0]
+    return (
+        "/",
+        "/?page=2",
+        f"/category/{post.category.slug}/",
+        f"/posts/{post.id}/",
+        f"/profile/{post.author.username}/",
+    )
+
+
+def page_ids(response):
+    if response.context is None or "page_obj" not in response.context:
+        return None
+    return [post.id for post in response.context["page_obj"]]
+
+
+def responses(client, urls):
+    cache.clear()
+    return [
+        (response.status_code, page_ids(response), response.content)
+        for response in map(client.get, urls)
+    ]
+
+
+def test_read_views_are_async(urls):
+    with async_views():
+        for url in urls:
+            assert iscoroutinefunction(resolve(url.split("?")[0]).func), (
+                f"Убедитесь, что под ASGI страница `{url}` обслуживается "
+                "асинхронным представлением."
+            )
+    assert not iscoroutinefunction(resolve("/").func)
+
+
+@pytest.mark.parametrize("mode", ["cursor", "numbered"])
+def test_async_pages_match_sync(
+    settings, client, user_client, urls, mode
+):
+    settings.BLOG_PAGINATION_MODE = mode
+    expected_anonymous = responses(client, urls)
+    expected_user = responses(user_client, urls)
+    with async_views():
+        assert responses(client, urls) == expected_anonymous, (
+            "Убедитесь, что асинхронные представления отдают те же "
+            "страницы, что и синхронные."
+        )
+        # у авторизованного пользователя в форме свой CSRF-токен
+        assert [
+            result[:2] for result in responses(user_client, urls)
+        ] == [result[:2] for result in expected_user]
+
+
+def test_async_views_not_found(client):
+    with async_views():
+        assert client.get("/posts/999999/").status_code == 404
+        assert client.get("/profile/nobody/").status_code == 404
+        assert client.get("/category/nothing/").status_code == 404
+
+
+def test_async_views_conditional_get(client, user_client, urls):
+    with async_views():
+        for page_client in (client, user_client):
+            # первый ответ ставит CSRF-куку, а она входит в ETag
+            page_client.get(urls[0])
+            for url in urls:
+                etag = page_client.get(url)["ETag"]
+                response = page_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                assert response.status_code == 304, (
+                    f"Убедитесь, что асинхронная страница `{url}` "
+                    "отвечает 304, если ETag совпадает."
+                )
+
+
+def test_middleware_async_chain():
+    async def page(request):
+        return HttpResponse(BODY)
+
+    middleware = ReadYourWritesMiddleware(CompressionMiddleware(page))
+    assert iscoroutinefunction(middleware)
+    request = RequestFactory().post("/", HTTP_ACCEPT_ENCODING="gzip")
+    response = asyncio.run(middleware(request))
+    assert response["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.content) == BODY.encode()
+    assert READ_YOUR_WRITES_COOKIE in response.cookies
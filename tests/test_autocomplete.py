@@ -0,0 +1,116 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from blog.autocomplete import AUTOCOMPLETE
+from blog.cache import get_generations
+from blog.models import Category
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def names(mixer):
+    mixer.blend("auth.User", username="alexey")
+    mixer.blend("auth.User", username="Alina")
+    mixer.blend("auth.User", username="boris")
+    mixer.blend(
+        "blog.Category", title="Альпинизм", slug="alpinism", is_published=True
+    )
+    mixer.blend(
+        "blog.Category", title="Скрытая", slug="al-hidden", is_published=False
+    )
+
+
+def suggest(client, prefix):
+    response = client.get("/autocomplete/", {"q": prefix})
+    assert response.status_code == 200
+    data = response.json()
+    return (
+        [user["username"] for user in data["users"]],
+        [category["slug"] for category in data["categories"]],
+    )
+
+
+def test_prefix_suggestions_without_queries(client, names):
+    suggest(client, "al")
+    with CaptureQueriesContext(connection) as queries:
+        users, categories = suggest(client, "AL")
+    assert users == ["alexey", "Alina"]
+    assert categories == ["alpinism"]
+    assert not queries.captured_queries, (
+        "Убедитесь, что подсказки берутся из индекса в памяти, без "
+        "запросов к базе данных."
+    )
+    assert suggest(client, "альп")[1] == ["alpinism"]
+
+
+def test_index_follows_changes(
+    client, mixer, names, django_capture_on_commit_callbacks
+):
+    suggest(client, "a")
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(
+            "/auth/registration/",
+            {
+                "username": "alla",
+                "password1": "Sl0zhnyi-parol",
+                "password2": "Sl0zhnyi-parol",
+            },
+        )
+    assert "alla" in suggest(client, "al")[0], (
+        "Убедитесь, что новый пользователь сразу появляется в подсказках."
+    )
+
+    category = Category.objects.get(slug="alpinism")
+    category.slug = "mountains"
+    with django_capture_on_commit_callbacks(execute=True):
+        category.save()
+    assert suggest(client, "al")[1] == []
+    assert suggest(client, "mount")[1] == ["mountains"]
+
+    category.is_published = False
+    with django_capture_on_commit_callbacks(execute=True):
+        category.save()
+    assert suggest(client, "альп")[1] == []
+
+
+def test_user_changes_applied_incrementally(
+    client, names, django_capture_on_commit_callbacks
+):
+    suggest(client, "a")
+    user = User.objects.get(username="boris")
+    generation = get_generations(AUTOCOMPLETE)[AUTOCOMPLETE]
+    user.set_password("Novyi-parol-123")
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+    assert get_generations(AUTOCOMPLETE)[AUTOCOMPLETE] == generation, (
+        "Убедитесь, что изменение пользователя без смены имени не "
+        "сбрасывает индекс подсказок."
+    )
+
+    user.username = "albert"
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+    assert suggest(client, "b")[0] == []
+    assert suggest(client, "al")[0] == ["albert", "alexey", "Alina"]
+    with django_capture_on_commit_callbacks(execute=True):
+        user.delete()
+    assert suggest(client, "al")[0] == ["alexey", "Alina"]
+
+
+def test_index_changed_only_after_commit(client, mixer, names):
+    suggest(client, "a")
+    generation = get_generations(AUTOCOMPLETE)[AUTOCOMPLETE]
+    with pytest.raises(DatabaseError), transaction.atomic():
+        mixer.blend(
+            "blog.Category", title="Альпы", slug="alps", is_published=True
+        )
+        assert get_generations(AUTOCOMPLETE)[AUTOCOMPLETE] == generation, (
+            "Убедитесь, что поколение подсказок меняется только после "
+            "фиксации транзакции."
+        )
+        raise DatabaseError
+    assert suggest(client, "альп")[1] == ["alpinism"]
+    assert get_generations(AUTOCOMPLETE)[AUTOCOMPLETE] == generation
@@ -0,0 +1,92 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def refreshed_count(post):
+    post.refresh_from_db(fields=["comment_count"])
+    return post.comment_count
+
+
+def test_comment_count_follows_comments(
+    mixer, user, post_with_published_location
+):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend(
+        "blog.Comment", post=post, author=user, is_published=True
+    )
+    assert refreshed_count(post) == 3, (
+        "Убедитесь, что при создании комментария увеличивается"
+        " `Post.comment_count`."
+    )
+
+    comments[0].is_published = False
+    comments[0].save()
+    assert refreshed_count(post) == 2, (
+        "Убедитесь, что скрытые комментарии не учитываются в"
+        " `Post.comment_count`."
+    )
+
+    comments[1].delete()
+    assert refreshed_count(post) == 1
+
+    comments[0].is_published = True
+    comments[0].save()
+    assert refreshed_count(post) == 2
+
+
+def test_reconcile_comment_counts(mixer, user, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(2).blend(
+        "blog.Comment", post=post, author=user, is_published=True
+    )
+    type(post).objects.filter(pk=post.pk).update(comment_count=42)
+
+    call_command("reconcile_comment_counts", chunk_size=1)
+    assert refreshed_count(post) == 2
+
+
+def comment_count_updates(queries):
+    return [
+        query["sql"] for query in queries
+        if query["sql"].startswith('UPDATE "blog_post"')
+        and "comment_count" in query["sql"]
+    ]
+
+
+def test_cascade_delete_recounts_once_per_post(
+    mixer, user, django_user_model, post_with_published_location
+):
+    post = post_with_published_location
+    commenter = django_user_model.objects.create(username="commenter")
+    mixer.cycle(5).blend(
+        "blog.Comment", post=post, author=commenter, is_published=True
+    )
+    mixer.blend("blog.Comment", post=post, author=user, is_published=True)
+
+    with CaptureQueriesContext(connection) as queries:
+        commenter.delete()
+    assert refreshed_count(post) == 1
+    assert len(comment_count_updates(queries)) == 1, (
+        "Убедитесь, что при каскадном удалении комментариев счётчик"
+        " публикации пересчитывается один раз, а не на каждый комментарий."
+    )
+
+
+def test_post_delete_skips_comment_recount(
+    mixer, user, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(5).blend(
+        "blog.Comment", post=post, author=user, is_published=True
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        post.delete()
+    assert not comment_count_updates(queries), (
+        "Убедитесь, что при удалении публикации не пересчитывается"
+        " счётчик её же комментариев."
+    )
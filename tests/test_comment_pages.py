@@ -0,0 +1,83 @@
+import re
+
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+N_COMMENTS = 45
+
+
+@pytest.fixture
+def post(mixer, user, published_category):
+    post = mixer.blend("blog.Post", author=user, category=published_category)
+    mixer.cycle(N_COMMENTS).blend(
+        "blog.Comment",
+        post=post,
+        author=user,
+        text=(f"Комментарий номер {i}." for i in range(N_COMMENTS)),
+    )
+    post.refresh_from_db()
+    return post
+
+
+def comment_ids(html):
+    return [int(i) for i in re.findall(r'name="comment_(\d+)"', html)]
+
+
+def test_first_page_inline(client, post):
+    response = client.get(f"/posts/{post.id}/")
+    content = response.content.decode()
+    assert len(comment_ids(content)) == 20, (
+        "Убедитесь, что на странице публикации сразу выводится только "
+        "первая страница комментариев."
+    )
+    assert "Показать ещё комментарии (25)" in content
+
+
+def test_load_more_walks_all_comments(client, post):
+    response = client.get(f"/posts/{post.id}/")
+    seen = comment_ids(response.content.decode())
+    cursor = response.context["next_cursor"]
+    shown = response.context["shown"]
+    remaining = []
+    while cursor:
+        data = client.get(
+            f"/posts/{post.id}/comments/",
+            {"cursor": cursor, "shown": shown},
+        ).json()
+        seen.extend(comment_ids(data["html"]))
+        remaining.append(data["remaining"])
+        cursor = data["next_cursor"]
+        shown = len(seen)
+    expected = list(
+        post.comments.order_by("created_at", "id").values_list(
+            "id", flat=True
+        )
+    )
+    assert seen == expected, (
+        "Убедитесь, что при подгрузке по курсору каждый комментарий "
+        "выводится один раз и по порядку."
+    )
+    assert remaining == [5, 0]
+
+
+def test_no_js_link_and_invalid_cursor(client, post):
+    first = client.get(f"/posts/{post.id}/")
+    response = client.get(
+        f"/posts/{post.id}/",
+        {"comments": first.context["next_cursor"], "shown": 20},
+    )
+    assert len(comment_ids(response.content.decode())) == 20
+    assert response.context["remaining"] == 5
+
+    response = client.get(f"/posts/{post.id}/comments/", {"cursor": "bad"})
+    assert response.status_code == 200
+    assert comment_ids(response.json()["html"]) == comment_ids(
+        first.content.decode()
+    )
+
+
+def test_hidden_post_comments_not_found(client, post):
+    post.is_published = False
+    post.save()
+    assert client.get(f"/posts/{post.id}/comments/").status_code == 404
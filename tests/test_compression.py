@@ -0,0 +1,118 @@
+import gzip
+
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from blog.compression import brotli, choose_encoding
+from blog.middleware import CompressionMiddleware
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def gzip_only(monkeypatch):
+    # brotli может быть не установлен - ответы проверяются на gzip
+    monkeypatch.setattr("blog.compression.ENCODINGS", ("gzip",))
+
+
+@pytest.fixture
+def post(mixer, user, published_category):
+    return mixer.blend("blog.Post", author=user, category=published_category)
+
+
+@pytest.mark.parametrize(
+    "header, expected", [
+        ("gzip, deflate, br", "gzip"),
+        ("br;q=0, gzip;q=0.5", "gzip"),
+        ("*", "gzip"),
+        ("*, gzip;q=0", None),
+        ("gzip;q=0", None),
+        ("", None),
+    ]
+)
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_feed_compressed(client, many_posts_with_published_locations):
+    plain = client.get("/")
+    response = client.get("/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert response["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response["Vary"]
+    assert gzip.decompress(response.content) == plain.content
+    assert len(response.content) < len(plain.content) / 3
+    assert response["Content-Length"] == str(len(response.content))
+
+
+def test_etag_weakened_and_conditional_get_works(client, post):
+    url = f"/posts/{post.id}/"
+    plain = client.get(url)
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+    assert response["Content-Encoding"] == "gzip"
+    assert response["ETag"] == "W/" + plain["ETag"], (
+        "Убедитесь, что у сжатого ответа слабый ETag."
+    )
+    response = client.get(
+        url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]
+    )
+    assert response.status_code == 304
+    assert not response.has_header("Content-Encoding")
+
+
+def request(accept_encoding="gzip"):
+    return RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+
+
+def test_small_and_binary_responses_not_compressed(settings):
+    small = CompressionMiddleware(
+        lambda request: HttpResponse("<p>коротко</p>")
+    )(request())
+    assert not small.has_header("Content-Encoding")
+
+    image = CompressionMiddleware(
+        lambda request: HttpResponse(
+            b"\xff" * settings.BLOG_COMPRESS_MIN_SIZE * 2,
+            content_type="image/jpeg",
+        )
+    )(request())
+    assert not image.has_header("Content-Encoding")
+
+
+def test_streaming_response_compressed_by_parts():
+    parts = [f"<li>строка {i}</li>".encode() * 50 for i in range(20)]
+    response = CompressionMiddleware(
+        lambda request: StreamingHttpResponse(iter(parts))
+    )(request())
+    assert response["Content-Encoding"] == "gzip"
+    assert not response.has_header("Content-Length")
+    chunks = list(response.streaming_content)
+    assert len(chunks) > 2, (
+        "Убедитесь, что потоковый ответ сжимается и отдаётся по частям."
+    )
+    assert gzip.decompress(b"".join(chunks)) == b"".join(parts)
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli не установлен")
+def test_brotli_preferred(monkeypatch):
+    monkeypatch.setattr("blog.compression.ENCODINGS", ("br", "gzip"))
+    assert choose_encoding("gzip, br") == "br"
+    body = "<p>текст</p>".encode() * 500
+    response = CompressionMiddleware(
+        lambda request: HttpResponse(body)
+    )(request("gzip, br"))
+    assert response["Content-Encoding"] == "br"
+    assert brotli.decompress(response.content) == body
+
+
+def test_brotli_skipped_for_csrf_pages(monkeypatch):
+    monkeypatch.setattr("blog.compression.ENCODINGS", ("br", "gzip"))
+    page = request("br, gzip")
+    page.META["CSRF_COOKIE_NEEDS_UPDATE"] = True
+    response = CompressionMiddleware(
+        lambda request: HttpResponse("<p>текст</p>" * 500)
+    )(page)
+    assert response["Content-Encoding"] == "gzip", (
+        "Убедитесь, что страницы с CSRF-токеном сжимаются gzip, у "
+        "которого есть защита от атаки BREACH."
+    )
@@ -0,0 +1,88 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import HttpResponseNotFound
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from blog.cache import FEED, conditional_page
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def post(mixer, user, published_category):
+    return mixer.blend("blog.Post", author=user, category=published_category)
+
+
+@pytest.fixture
+def urls(post):
+    return (
+        "/",
+        f"/category/{post.category.slug}/",
+        f"/posts/{post.id}/",
+        f"/profile/{post.author.username}/",
+    )
+
+
+def test_not_modified_without_page_query(client, urls):
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.has_header("ETag"), (
+            f"Убедитесь, что страница `{url}` отдаёт ETag."
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        assert response.status_code == 304, (
+            f"Убедитесь, что страница `{url}` отвечает 304, если ETag "
+            "совпадает."
+        )
+        assert len(queries) <= 1
+
+
+def test_if_modified_since_ignored(client, post, urls):
+    response = client.get(urls[0])
+    assert not response.has_header("Last-Modified")
+    post.text = "Изменение в ту же секунду"
+    post.save()
+    response = client.get(urls[0], HTTP_IF_MODIFIED_SINCE=http_date())
+    assert response.status_code == 200, (
+        "Убедитесь, что страница не отвечает 304 по If-Modified-Since: "
+        "изменение в ту же секунду по нему не заметно."
+    )
+
+
+def test_validators_change_after_edit(client, post, urls):
+    etags = [client.get(url)["ETag"] for url in urls]
+    post.text = "Новый текст публикации"
+    post.save()
+    for url, etag in zip(urls, etags):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            f"Убедитесь, что после изменения публикации страница `{url}` "
+            "отдаётся заново."
+        )
+
+
+def test_etag_differs_per_user(user_client, another_user_client, post):
+    url = f"/posts/{post.id}/"
+    etag = user_client.get(url)["ETag"]
+    response = another_user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+def test_no_validators_on_errors(rf):
+    @conditional_page(lambda: (FEED,))
+    def missing(request):
+        return HttpResponseNotFound()
+
+    request = rf.get("/")
+    request.user = AnonymousUser()
+    response = missing(request)
+    assert response.status_code == 404
+    assert not response.has_header("ETag"), (
+        "Убедитесь, что ответ 404 отдаётся без ETag."
+    )
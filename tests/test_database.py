@@ -0,0 +1,56 @@
+import pytest
+from django.conf import settings
+from django.db import connection
+
+from blog.benchmarks import index_definitions
+from blog.models import Post
+from blog.utils import iterate_in_chunks
+
+pytestmark = [pytest.mark.django_db]
+
+
+def pragma(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+def test_connection_pragmas():
+    assert pragma("busy_timeout") == settings.SQLITE_PRAGMAS["busy_timeout"]
+    assert pragma("synchronous") == 1  # NORMAL
+    assert pragma("temp_store") == 2  # MEMORY
+    assert pragma("cache_size") == settings.SQLITE_PRAGMAS["cache_size"]
+
+
+def test_persistent_connections_with_health_checks():
+    database = settings.DATABASES["default"]
+    assert database["CONN_MAX_AGE"] > 0
+    assert database["CONN_HEALTH_CHECKS"]
+
+
+def test_write_transactions_are_immediate():
+    assert connection.transaction_mode == "IMMEDIATE", (
+        "Убедитесь, что транзакции SQLite сразу берут блокировку записи."
+    )
+
+
+@pytest.mark.parametrize("values", [False, True])
+def test_iterate_in_chunks(mixer, values):
+    posts = mixer.cycle(5).blend("blog.Post")
+    queryset = Post.objects.all()
+    if values:
+        queryset = queryset.values_list("pk", "title")
+    chunks = list(iterate_in_chunks(queryset, 2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    pks = [row[0] if values else row.pk for chunk in chunks for row in chunk]
+    assert pks == sorted(post.pk for post in posts)
+
+
+def test_covering_indexes_only_on_postgresql():
+    definitions = index_definitions(
+        ["post_author_feed_idx", "comment_post_created_idx"]
+    )
+    assert len(definitions) == 2
+    assert not any("INCLUDE" in sql for sql in definitions.values()), (
+        "Убедитесь, что индексы с INCLUDE создаются только в PostgreSQL."
+    )
@@ -0,0 +1,75 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def visibility(posts):
+    return {type(post).objects.get(pk=post.pk).is_visible for post in posts}
+
+
+def test_category_toggle_updates_posts(
+    mixer, user, published_category, many_posts_with_published_locations
+):
+    posts = many_posts_with_published_locations
+    assert visibility(posts) == {True}
+
+    published_category.is_published = False
+    published_category.save()
+    assert visibility(posts) == {False}, (
+        "Убедитесь, что при снятии категории с публикации её публикации"
+        " пропадают из лент (`Post.is_visible`)."
+    )
+
+    published_category.is_published = True
+    published_category.save()
+    assert visibility(posts) == {True}
+
+
+def test_post_changes_category(
+    mixer, post_with_published_location, published_category
+):
+    post = post_with_published_location
+    hidden_category = mixer.blend("blog.Category", is_published=False)
+    post.category = hidden_category
+    post.save()
+    assert visibility([post]) == {False}
+
+    post.category = published_category
+    post.save()
+    assert visibility([post]) == {True}
+
+    published_category.delete()
+    assert visibility([post]) == {False}
+
+
+def test_excerpt_and_reading_time(mixer, user, published_category):
+    text = " ".join(["слово"] * 450)
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category, text=text
+    )
+    assert post.excerpt == " ".join(["слово"] * 10) + " …"
+    assert post.reading_time == 2
+
+    post.text = "Короткий текст"
+    post.save()
+    assert post.excerpt == "Короткий текст"
+    assert post.reading_time == 1
+
+
+def test_feeds_do_not_load_text(
+    client, user, many_posts_with_published_locations
+):
+    for url in ("/", f"/profile/{user.username}/"):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        first_post = response.context["page_obj"][0]
+        assert first_post.excerpt in response.content.decode()
+        assert not any(
+            '"blog_post"."text"' in query["sql"]
+            for query in queries.captured_queries
+        ), (
+            f"Убедитесь, что лента `{url}` не загружает полный текст "
+            "публикаций."
+        )
@@ -0,0 +1,50 @@
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def post_with_comments(mixer, user, published_category, published_location):
+    post = mixer.blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        location=published_location,
+    )
+    commenters = mixer.cycle(5).blend("auth.User")
+    mixer.cycle(20).blend(
+        "blog.Comment", post=post, author=(u for u in commenters * 4)
+    )
+    return post
+
+
+@pytest.mark.parametrize(
+    "client_fixture, expected_queries",
+    [
+        # публикация со связанными объектами и комментарии с авторами
+        ("unlogged_client", 2),
+        # плюс сессия и пользователь
+        ("another_user_client", 4),
+        ("user_client", 4),
+    ],
+)
+def test_post_detail_query_count(
+    request, django_assert_num_queries, post_with_comments,
+    client_fixture, expected_queries,
+):
+    client = request.getfixturevalue(client_fixture)
+    with django_assert_num_queries(expected_queries):
+        response = client.get(f"/posts/{post_with_comments.id}/")
+    assert response.status_code == 200
+    assert len(response.context["comments"]) == 20
+    assert response.context["remaining"] == 0
+
+
+def test_draft_visible_only_to_author(
+    user_client, another_user_client, post_with_comments
+):
+    post_with_comments.is_published = False
+    post_with_comments.save()
+    url = f"/posts/{post_with_comments.id}/"
+    assert user_client.get(url).status_code == 200
+    assert another_user_client.get(url).status_code == 404
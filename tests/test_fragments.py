@@ -0,0 +1,86 @@
+import pytest
+from django.core.cache import cache
+
+from blog import fragments
+from blog.cache import SITE, get_generations, post_scope
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def post(mixer, user, published_category):
+    return mixer.blend("blog.Post", author=user, category=published_category)
+
+
+@pytest.fixture
+def comment(mixer, post, another_user):
+    return mixer.blend("blog.Comment", post=post, author=another_user)
+
+
+@pytest.fixture
+def count_renders(monkeypatch):
+    rendered = []
+    render = fragments.render_to_string
+
+    def counting_render(template_name, context):
+        rendered.append(template_name)
+        return render(template_name, context)
+
+    monkeypatch.setattr(fragments, "render_to_string", counting_render)
+    return rendered
+
+
+def test_cards_rendered_once_per_version(user_client, post, count_renders):
+    user_client.get("/")
+    user_client.get(f"/profile/{post.author.username}/")
+    assert count_renders == ["includes/post_card.html"], (
+        "Убедитесь, что карточка публикации берётся из кэша, пока "
+        "публикация не изменилась."
+    )
+    post.title = "Изменённый заголовок"
+    post.save()
+    assert "Изменённый заголовок" in user_client.get("/").content.decode()
+
+
+def test_comment_buttons_per_user(
+    user_client, another_user_client, post, comment
+):
+    url = f"/posts/{post.id}/"
+    edit_url = f"/posts/{post.id}/edit_comment/{comment.id}/"
+    assert edit_url not in user_client.get(url).content.decode()
+    assert edit_url in another_user_client.get(url).content.decode(), (
+        "Убедитесь, что кнопки редактирования и удаления комментария видит"
+        " его автор, даже если комментарии взяты из кэша."
+    )
+
+
+def test_comment_edit_invalidates_fragment(user_client, post, comment):
+    url = f"/posts/{post.id}/"
+    user_client.get(url)
+    comment.text = "Исправленный комментарий"
+    comment.save()
+    assert "Исправленный комментарий" in user_client.get(url).content.decode()
+
+
+def test_fragments_cached_during_transaction_invalidated_on_commit(
+    user_client, mixer, post, another_user, django_capture_on_commit_callbacks
+):
+    url = f"/posts/{post.id}/"
+    with django_capture_on_commit_callbacks(execute=True):
+        mixer.blend(
+            "blog.Comment", post=post, author=another_user,
+            text="Комментарий из транзакции",
+        )
+        # параллельный запрос отрисовал фрагменты по прежним данным
+        generations = get_generations(SITE, post_scope(post.pk))
+        cache.set_many({
+            fragments._fragment_key("card", post.pk, generations): "",
+            fragments._comments_key(post, generations, None): ([], None),
+        })
+    assert "(1)" in user_client.get("/").content.decode()
+    assert "Комментарий из транзакции" in user_client.get(
+        url
+    ).content.decode(), (
+        "Убедитесь, что фрагменты, закэшированные до фиксации транзакции, "
+        "после неё не отдаются."
+    )
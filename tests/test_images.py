@@ -0,0 +1,81 @@
+from io import BytesIO, StringIO
+
+import pytest
+from PIL import Image
+from django.core.files.images import ImageFile
+from django.core.management import call_command
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def image_file(width, height, name="photo.jpg"):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "orange").save(buffer, "JPEG")
+    buffer.seek(0)
+    return ImageFile(buffer, name=name)
+
+
+@pytest.fixture
+def post(
+    mixer, user, published_category, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        post = mixer.blend(
+            "blog.Post",
+            author=user,
+            category=published_category,
+            image=image_file(2000, 1500),
+        )
+    post.refresh_from_db()
+    return post
+
+
+def test_renditions_created(post, media_root):
+    data = post.image_renditions
+    assert data["source"] == post.image.name
+    assert (data["width"], data["height"]) == (2000, 1500)
+    card = data["renditions"]["card"]
+    assert (card["width"], card["height"]) == (640, 480)
+    assert data["renditions"]["detail_2x"]["width"] == 2000, (
+        "Убедитесь, что версии изображения не больше оригинала."
+    )
+    for info in data["renditions"].values():
+        for name in (info["jpeg"], info["webp"]):
+            assert (media_root / name).is_file()
+    with Image.open(media_root / card["webp"]) as image:
+        assert image.format == "WEBP"
+
+
+def test_feed_uses_srcset(client, post):
+    content = client.get("/").content.decode()
+    card = post.image_renditions["renditions"]["card"]
+    assert content.count("<img") == 2  # логотип и изображение публикации
+    assert 'type="image/webp"' in content
+    assert card["jpeg"] in content and "1280w" in content
+    assert 'width="640" height="480"' in content
+    assert 'loading="lazy"' in content
+
+
+def test_original_shown_until_ready(client, mixer, user, published_category):
+    post = mixer.blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        image=image_file(800, 600),
+    )
+    assert post.image_renditions == {}
+    content = client.get(f"/posts/{post.id}/").content.decode()
+    assert post.image.url in content and "srcset" not in content
+
+    call_command("backfill_renditions", stdout=StringIO())
+    post.refresh_from_db()
+    assert post.image_renditions["renditions"]["card"]["width"] == 640
+    assert "srcset" in client.get(f"/posts/{post.id}/").content.decode(), (
+        "Убедитесь, что после создания версий кэш страницы сбрасывается."
+    )
@@ -0,0 +1,117 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from blog.storage import ContentAddressedStorage
+
+pytestmark = [pytest.mark.django_db]
+
+CONTENT = b"0123456789" * 10
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.BLOG_MEDIA_ACCEL = None
+    return tmp_path
+
+
+@pytest.fixture
+def hashed_name():
+    return ContentAddressedStorage().save(
+        "post_images/photo.jpg", ContentFile(CONTENT)
+    )
+
+
+def body(response):
+    return b"".join(response.streaming_content)
+
+
+def test_hashed_file_is_immutable(client, hashed_name):
+    response = client.get(f"/media/{hashed_name}")
+    assert response.status_code == 200
+    assert body(response) == CONTENT
+    assert response["Content-Type"] == "image/jpeg"
+    assert response["Accept-Ranges"] == "bytes"
+    cache_control = response["Cache-Control"]
+    assert "immutable" in cache_control and "max-age=31536000" in cache_control
+
+
+def test_legacy_file_not_immutable(client, settings):
+    name = FileSystemStorage().save("post_images/old.jpg", ContentFile(b"x"))
+    response = client.get(f"/media/{name}")
+    assert response.status_code == 200
+    cache_control = response["Cache-Control"]
+    assert "immutable" not in cache_control
+    assert f"max-age={settings.BLOG_MEDIA_MAX_AGE}" in cache_control
+
+
+def test_range_request(client, hashed_name):
+    response = client.get(f"/media/{hashed_name}", HTTP_RANGE="bytes=5-14")
+    assert response.status_code == 206
+    assert body(response) == CONTENT[5:15]
+    assert response["Content-Length"] == "10"
+    assert response["Content-Range"] == f"bytes 5-14/{len(CONTENT)}"
+
+    response = client.get(f"/media/{hashed_name}", HTTP_RANGE="bytes=-3")
+    assert body(response) == CONTENT[-3:]
+
+    response = client.get(f"/media/{hashed_name}", HTTP_RANGE="bytes=500-")
+    assert response.status_code == 416
+    assert response["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_stale_if_range_returns_whole_file(client, hashed_name):
+    response = client.get(
+        f"/media/{hashed_name}",
+        HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"outdated"',
+    )
+    assert response.status_code == 200
+    assert body(response) == CONTENT
+
+
+def test_conditional_requests(client, hashed_name):
+    response = client.get(f"/media/{hashed_name}")
+    response = client.get(
+        f"/media/{hashed_name}",
+        HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+    )
+    assert response.status_code == 304
+    assert "immutable" in response["Cache-Control"]
+
+    response = client.get(
+        f"/media/{hashed_name}", HTTP_IF_NONE_MATCH=response["ETag"]
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize(
+    "accel, header", [
+        ("x-accel-redirect", "X-Accel-Redirect"),
+        ("x-sendfile", "X-Sendfile"),
+    ]
+)
+def test_transfer_offloaded_to_proxy(
+    client, settings, media_root, hashed_name, accel, header
+):
+    settings.BLOG_MEDIA_ACCEL = accel
+    response = client.get(f"/media/{hashed_name}")
+    assert response.status_code == 200
+    assert response.content == b"", (
+        "Убедитесь, что при передаче файла прокси Django не читает файл."
+    )
+    expected = {
+        "X-Accel-Redirect": (
+            settings.BLOG_MEDIA_ACCEL_PREFIX + hashed_name
+        ),
+        "X-Sendfile": str(media_root / hashed_name),
+    }
+    assert response[header] == expected[header]
+    assert "immutable" in response["Cache-Control"]
+
+
+@pytest.mark.parametrize(
+    "path", ["post_images/missing.jpg", "../settings.py", "post_images"]
+)
+def test_missing_and_unsafe_paths(client, path):
+    assert client.get(f"/media/{path}").status_code == 404
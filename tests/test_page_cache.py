@@ -0,0 +1,119 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from blog.cache import FEED, SITE, get_generations, page_cache_key
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def post(mixer, user, published_category, published_location):
+    return mixer.blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        location=published_location,
+    )
+
+
+def get_without_queries(client, url):
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    return response, len(queries)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/",
+        "/category/{post.category.slug}/",
+        "/posts/{post.id}/",
+    ],
+)
+def test_anonymous_pages_cached(client, post, url):
+    response, n_queries = get_without_queries(client, url.format(post=post))
+    assert response.status_code == 200
+    assert post.title in response.content.decode()
+    assert n_queries == 0, (
+        "Убедитесь, что повторный запрос страницы анонимным пользователем"
+        " не обращается к базе данных."
+    )
+
+
+def test_post_edit_invalidates_pages(client, post):
+    urls = ("/", f"/posts/{post.id}/", f"/category/{post.category.slug}/")
+    for url in urls:
+        client.get(url)
+    post.title = "Новый заголовок публикации"
+    post.save()
+    for url in urls:
+        content = client.get(url).content.decode()
+        assert "Новый заголовок публикации" in content, (
+            "Убедитесь, что после изменения публикации закэшированные "
+            "страницы обновляются."
+        )
+
+
+def test_category_move_invalidates_old_category(client, mixer, post):
+    old_url = f"/category/{post.category.slug}/"
+    client.get(old_url)
+    post.category = mixer.blend("blog.Category", is_published=True)
+    post.save()
+    assert post.title not in client.get(old_url).content.decode()
+
+
+def test_comment_updates_counter_in_feed(client, mixer, user, post):
+    client.get("/")
+    mixer.blend("blog.Comment", post=post, author=user)
+    assert "(1)" in client.get("/").content.decode()
+
+
+def test_location_rename_invalidates_site(client, post):
+    client.get(f"/posts/{post.id}/")
+    post.location.name = "Переименованное место"
+    post.location.save()
+    assert "Переименованное место" in client.get(
+        f"/posts/{post.id}/"
+    ).content.decode()
+
+
+def test_logged_in_user_bypasses_cache(user_client, post):
+    _, n_queries = get_without_queries(user_client, "/")
+    assert n_queries > 0
+
+
+def test_recent_writer_bypasses_cache(client, post):
+    client.get("/")
+    client.post("/auth/login/", {"username": "nobody", "password": "x"})
+    assert "blog_recent_write" in client.cookies
+    _, n_queries = get_without_queries(client, "/")
+    assert n_queries > 0, (
+        "Убедитесь, что сразу после отправки формы страницы отдаются в "
+        "обход кэша."
+    )
+
+
+def test_pages_cached_during_transaction_invalidated_on_commit(
+    client, mixer, user, post, django_capture_on_commit_callbacks
+):
+    stale = client.get("/").content
+    with django_capture_on_commit_callbacks(execute=True):
+        mixer.blend("blog.Comment", post=post, author=user)
+        # параллельный запрос ещё видит прежние данные и кладёт их в кэш
+        # под поколением, сменённым до фиксации
+        cache.set(
+            page_cache_key(RequestFactory().get("/"), get_generations(
+                SITE, FEED
+            )),
+            (stale, "text/html; charset=utf-8"),
+            settings.BLOG_PAGE_CACHE_TIMEOUT,
+        )
+    assert "(1)" in client.get("/").content.decode(), (
+        "Убедитесь, что после фиксации транзакции поколения меняются "
+        "ещё раз и страницы, закэшированные до фиксации, не отдаются."
+    )
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def same_date_posts(mixer, user, published_category):
+    pub_date = timezone.now() - timedelta(days=1)
+    return mixer.cycle(N_PER_PAGE * 2 + 3).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        pub_date=pub_date,
+    )
+
+
+def collect_feed(client, url):
+    seen = []
+    response = client.get(url)
+    while True:
+        page_obj = response.context["page_obj"]
+        seen.extend(post.id for post in page_obj)
+        if not page_obj.has_next():
+            return seen, page_obj
+        response = client.get(f"{url}?cursor={page_obj.next_cursor}")
+
+
+def test_cursor_walks_whole_feed(
+    user_client, many_posts_with_published_locations
+):
+    posts = many_posts_with_published_locations
+    seen, _ = collect_feed(user_client, "/")
+    assert sorted(seen) == sorted(post.id for post in posts), (
+        "Убедитесь, что при переходе по курсорам каждая публикация ленты"
+        " показывается ровно один раз."
+    )
+
+
+def test_cursor_with_equal_pub_dates(user_client, user, same_date_posts):
+    seen, last_page = collect_feed(user_client, f"/profile/{user.username}/")
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(same_date_posts)
+
+    response = user_client.get(
+        f"/profile/{user.username}/?cursor={last_page.previous_cursor}"
+    )
+    previous_page = response.context["page_obj"]
+    assert len(previous_page) == N_PER_PAGE
+    assert previous_page.has_next()
+    assert [post.id for post in previous_page] == seen[
+        N_PER_PAGE:N_PER_PAGE * 2
+    ]
+
+
+def test_legacy_page_links(user_client, many_posts_with_published_locations):
+    first_page = user_client.get("/").context["page_obj"]
+    second_page = user_client.get("/?page=2").context["page_obj"]
+    assert second_page.has_previous() and not second_page.has_next()
+    assert {post.id for post in first_page}.isdisjoint(
+        post.id for post in second_page
+    ), "Убедитесь, что ссылки вида `?page=N` продолжают работать."
+
+    response = user_client.get("/?page=100")
+    assert response.status_code == 200
+    response = user_client.get("/?cursor=not-a-cursor")
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def numbered_pagination(settings):
+    settings.BLOG_PAGINATION_MODE = "numbered"
+    cache.clear()
+
+
+def test_numbered_mode_bounded_links(
+    numbered_pagination, user_client, many_posts_with_published_locations
+):
+    response = user_client.get("/")
+    page_obj = response.context["page_obj"]
+    assert len(page_obj) == N_PER_PAGE and page_obj.has_next()
+    assert list(page_obj.elided_page_range) == [1, 2]
+
+    last_page = user_client.get("/?page=2").context["page_obj"]
+    assert not last_page.has_next()
+    assert len(last_page) == len(many_posts_with_published_locations) - (
+        N_PER_PAGE
+    )
+    assert user_client.get("/?page=50").context["page_obj"].number == 2
+
+
+def test_numbered_mode_caches_count(
+    numbered_pagination, user_client, many_posts_with_published_locations
+):
+    user_client.get("/")
+    with CaptureQueriesContext(connection) as queries:
+        user_client.get("/")
+    assert not any(
+        "COUNT(" in query["sql"].upper() for query in queries.captured_queries
+    ), "Убедитесь, что общее количество публикаций берётся из кэша."
+
+
+def test_numbered_mode_stale_count_leads_to_last_page(
+    numbered_pagination, user, user_client,
+    many_posts_with_published_locations,
+):
+    cache.set(f"blog:count:/:{user.pk}", 10_000)
+    page_obj = user_client.get("/?page=50").context["page_obj"]
+    assert page_obj.number == 2, (
+        "Убедитесь, что при завышенном сохранённом количестве публикаций "
+        "запрос за пределами ленты ведёт на её последнюю страницу."
+    )
+    assert cache.get(f"blog:count:/:{user.pk}") == len(
+        many_posts_with_published_locations
+    )
@@ -0,0 +1,112 @@
+import pytest
+from django.contrib.sessions.models import Session
+from django.db import DEFAULT_DB_ALIAS, OperationalError, router
+from django.test import RequestFactory
+
+from blog import routers
+from blog.cache import READ_YOUR_WRITES_COOKIE
+from blog.models import Post, ReplicationHeartbeat
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def post(mixer, user, published_category):
+    return mixer.blend("blog.Post", author=user, category=published_category)
+
+
+@pytest.fixture
+def lag(settings, monkeypatch):
+    settings.BLOG_DATABASE_REPLICAS = ["replica"]
+    monkeypatch.setattr(routers, "_health", {})
+    lags = {"replica": 0.0}
+
+    def replication_lag(alias):
+        lags["checks"] = lags.get("checks", 0) + 1
+        if isinstance(lags[alias], Exception):
+            raise lags[alias]
+        return lags[alias]
+
+    monkeypatch.setattr(routers, "replication_lag", replication_lag)
+    return lags
+
+
+@routers.read_from_replica
+def read_database(request, model=Post):
+    return router.db_for_read(model)
+
+
+def test_feed_reads_from_replica(lag):
+    request = RequestFactory().get("/")
+    assert read_database(request) == "replica"
+    assert read_database(request, Session) == DEFAULT_DB_ALIAS, (
+        "Убедитесь, что сессии всегда читаются из основной базы."
+    )
+    assert router.db_for_read(Post) == DEFAULT_DB_ALIAS, (
+        "Убедитесь, что вне страниц лент и публикаций чтение идёт из "
+        "основной базы."
+    )
+    assert router.db_for_write(Post) == DEFAULT_DB_ALIAS
+
+
+def test_recent_writer_pinned_to_primary(lag):
+    request = RequestFactory().get("/")
+    request.COOKIES[READ_YOUR_WRITES_COOKIE] = "1"
+    assert read_database(request) == DEFAULT_DB_ALIAS, (
+        "Убедитесь, что после записи пользователь читает из основной базы."
+    )
+    assert read_database(RequestFactory().post("/")) == DEFAULT_DB_ALIAS
+
+
+@pytest.mark.parametrize("replica_lag", [60.0, OperationalError("down")])
+def test_lagging_replica_skipped(lag, replica_lag):
+    lag["replica"] = replica_lag
+    assert read_database(RequestFactory().get("/")) == DEFAULT_DB_ALIAS, (
+        "Убедитесь, что отставшая или недоступная реплика пропускается."
+    )
+
+
+def test_lag_checked_once_per_interval(lag):
+    request = RequestFactory().get("/")
+    for _ in range(3):
+        read_database(request)
+    assert lag["checks"] == 1
+
+
+def test_replication_lag_from_heartbeat():
+    assert routers.replication_lag(DEFAULT_DB_ALIAS) == 0.0
+    routers.record_write()
+    routers.record_write()
+    assert ReplicationHeartbeat.objects.count() == 1
+    assert routers.replication_lag(DEFAULT_DB_ALIAS) == 0.0
+
+
+def test_pages_read_from_replica_until_write(
+    user_client, settings, monkeypatch, post
+):
+    settings.BLOG_DATABASE_REPLICAS = ["replica"]
+    # основная база играет роль реплики, а вызовы считаются
+    calls = []
+    monkeypatch.setattr(
+        routers, "healthy_replicas",
+        lambda: calls.append(True) or [DEFAULT_DB_ALIAS],
+    )
+    assert user_client.get("/").status_code == 200
+    assert calls, "Убедитесь, что лента читается из реплики."
+
+    response = user_client.post(
+        f"/posts/{post.id}/add_comment/", {"text": "Комментарий"}
+    )
+    assert response.cookies[READ_YOUR_WRITES_COOKIE]
+    assert ReplicationHeartbeat.objects.exists(), (
+        "Убедитесь, что запись через сайт обновляет отметку репликации."
+    )
+    calls.clear()
+    assert user_client.get(f"/posts/{post.id}/").status_code == 200
+    assert not calls
+
+
+def test_no_migrations_on_replicas(settings):
+    settings.BLOG_DATABASE_REPLICAS = ["replica"]
+    assert router.allow_migrate("replica", "blog") is False
+    assert router.allow_migrate(DEFAULT_DB_ALIAS, "blog")
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_scheduled_post_becomes_visible(
+    user_client, user, mixer, published_category
+):
+    pub_date = timezone.now() + timedelta(hours=1)
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=pub_date,
+    )
+    assert not type(post).objects.get(pk=post.pk).is_visible
+
+    from blog.scheduling import next_publication_time, publish_due_posts
+
+    assert next_publication_time() == pub_date
+    assert publish_due_posts() == 0
+    assert publish_due_posts(now=pub_date) == 1, (
+        "Убедитесь, что отложенная публикация включается, когда наступает"
+        " её время."
+    )
+    assert next_publication_time(now=pub_date) is None
+
+    index_posts = user_client.get("/").context["page_obj"]
+    assert [item.pk for item in index_posts] == [post.pk]
+
+
+def test_publish_scheduled_command(mixer, user, published_category):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() + timedelta(seconds=1),
+    )
+    type(post).objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() - timedelta(seconds=1)
+    )
+    call_command("publish_scheduled")
+    assert type(post).objects.get(pk=post.pk).is_visible
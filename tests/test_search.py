@@ -0,0 +1,104 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from blog import fts
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def posts(mixer, user, published_category):
+    def blend(**kwargs):
+        return mixer.blend(
+            "blog.Post", author=user, category=published_category, **kwargs
+        )
+
+    return {
+        "title": blend(title="Велосипедная прогулка", text="Короткий текст"),
+        "text": blend(
+            title="Выходные", text="Катались на велосипеде вдоль реки"
+        ),
+        "hidden": blend(
+            title="Велосипед в ремонте", text="Черновик", is_published=False
+        ),
+        "other": blend(title="Кулинария", text="Рецепт <b>пирога</b>"),
+    }
+
+
+def search(client, **params):
+    response = client.get("/search/", params)
+    assert response.status_code == 200
+    return response
+
+
+def test_ranked_visible_results(client, posts):
+    page_obj = search(client, q="велосипед").context["page_obj"]
+    assert [post.id for post in page_obj] == [
+        posts["title"].id, posts["text"].id
+    ], (
+        "Убедитесь, что поиск находит опубликованные записи по префиксу "
+        "слова и ставит совпадения в заголовке выше совпадений в тексте."
+    )
+
+
+def test_snippet_highlight_escaped(client, posts):
+    response = search(client, q="рецепт")
+    content = response.content.decode()
+    assert "<mark>Рецепт</mark>" in content
+    assert "&lt;b&gt;пирога&lt;/b&gt;" in content
+
+
+def test_search_in_comments(client, mixer, user, posts):
+    mixer.blend(
+        "blog.Comment", post=posts["other"], author=user,
+        text="Добавьте больше корицы",
+    )
+    assert not search(client, q="корица").context["page_obj"]
+    page_obj = search(client, q="корицы", comments=1).context["page_obj"]
+    assert [post.id for post in page_obj] == [posts["other"].id]
+    assert "<mark>корицы</mark>" in page_obj[0].search_snippet, (
+        "Убедитесь, что для совпадения в комментарии показывается "
+        "фрагмент комментария."
+    )
+
+
+def test_keyset_pages(client, mixer, user, published_category):
+    mixer.cycle(25).blend(
+        "blog.Post", author=user, category=published_category,
+        title="Заметка", text="Общий текст",
+    )
+    seen = []
+    page_obj = search(client, q="заметка").context["page_obj"]
+    seen.extend(post.id for post in page_obj)
+    while page_obj.has_next():
+        page_obj = search(
+            client, q="заметка", cursor=page_obj.next_cursor
+        ).context["page_obj"]
+        seen.extend(post.id for post in page_obj)
+    assert len(seen) == len(set(seen)) == 25
+    assert search(client, q="заметка", cursor="bad").status_code == 200
+
+
+@pytest.mark.parametrize(
+    "options", [{"chunk_size": 2}, {"full": True}], ids=["chunks", "full"]
+)
+def test_rebuild_command(client, mixer, user, posts, options):
+    # индекс пуст, а одна запись уже проиндексирована триггером
+    fts.drop_schema(connection)
+    fts.create_schema(connection)
+    mixer.blend(
+        "blog.Comment", post=posts["text"], author=user, text="Велосипед"
+    )
+    call_command("rebuild_search_index", stdout=StringIO(), **options)
+    page_obj = search(client, q="велосипед").context["page_obj"]
+    assert len(page_obj) == 2
+    with connection.cursor() as cursor:
+        for table in (fts.POST_FTS_TABLE, fts.COMMENT_FTS_TABLE):
+            # integrity-check падает, если индекс расходится с таблицей
+            cursor.execute(
+                f"INSERT INTO {table}({table}, rank) "
+                "VALUES ('integrity-check', 1)"
+            )
@@ -0,0 +1,229 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+from django.db import OperationalError, connection, connections, transaction
+
+from blog.backends.sqlite_pool.base import DatabaseWrapper
+from blog.backends.sqlite_pool.pool import close_pool, get_pool
+
+pytestmark = [pytest.mark.django_db]
+
+ALIAS = "pool"
+
+
+@pytest.fixture
+def database(tmp_path):
+    name = str(tmp_path / "pool.sqlite3")
+    settings_dict = {
+        **connection.settings_dict,
+        "NAME": name,
+        "CONN_MAX_AGE": 0,
+        "OPTIONS": {
+            "init_command": "PRAGMA journal_mode=WAL;PRAGMA busy_timeout=100",
+            "transaction_mode": "IMMEDIATE",
+            "pool_size": 2,
+            "write_queue_size": 8,
+            "write_timeout": 5,
+        },
+    }
+    with pooled(settings_dict) as wrapper, wrapper.cursor() as cursor:
+        cursor.execute("CREATE TABLE item (value INTEGER)")
+    yield settings_dict
+    close_pool(name)
+
+
+@contextmanager
+def pooled(settings_dict):
+    # каждый поток работает со своей обёрткой, как с connections["default"]
+    wrapper = DatabaseWrapper(settings_dict, ALIAS)
+    connections[ALIAS] = wrapper
+    try:
+        yield wrapper
+    finally:
+        wrapper.close()
+        del connections[ALIAS]
+
+
+def count(wrapper):
+    with wrapper.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM item")
+        return cursor.fetchone()[0]
+
+
+def test_reads_use_pool_and_writes_use_writer(database):
+    with pooled(database) as wrapper:
+        count(wrapper)
+        reader = wrapper.reader
+        assert wrapper.connection is reader
+        assert reader.execute("PRAGMA query_only").fetchone()[0] == 1
+        with wrapper.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES (1)")
+            assert wrapper.connection is wrapper.writer is not None
+        assert wrapper.writer is None, (
+            "Убедитесь, что вне транзакции пишущее соединение "
+            "освобождается после закрытия курсора."
+        )
+        assert count(wrapper) == 1
+    with pooled(database) as wrapper:
+        wrapper.ensure_connection()
+        assert wrapper.connection is reader, (
+            "Убедитесь, что закрытое соединение возвращается в пул."
+        )
+
+
+def test_transaction_uses_writer(database):
+    with pooled(database) as wrapper:
+        with transaction.atomic(using=ALIAS):
+            assert wrapper.connection is wrapper.writer is not None, (
+                "Убедитесь, что транзакция целиком идёт через пишущее "
+                "соединение."
+            )
+            with wrapper.cursor() as cursor:
+                cursor.execute("INSERT INTO item VALUES (1)")
+            assert count(wrapper) == 1
+        assert wrapper.writer is None
+        assert wrapper.connection is wrapper.reader
+        assert count(wrapper) == 1
+
+
+def test_reads_not_blocked_by_writer(database):
+    in_transaction = threading.Event()
+    done = threading.Event()
+
+    def write():
+        with pooled(database) as wrapper, transaction.atomic(using=ALIAS):
+            with wrapper.cursor() as cursor:
+                cursor.execute("INSERT INTO item VALUES (1)")
+            in_transaction.set()
+            done.wait(5)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        assert in_transaction.wait(5)
+        with pooled(database) as wrapper:
+            assert count(wrapper) == 0
+    finally:
+        done.set()
+        writer.join()
+
+
+def test_concurrent_writers_serialized(database):
+    threads, iterations = 6, 10
+    errors = []
+
+    def write():
+        with pooled(database) as wrapper:
+            for _ in range(iterations):
+                try:
+                    with transaction.atomic(using=ALIAS):
+                        value = count(wrapper)
+                        time.sleep(0.001)
+                        with wrapper.cursor() as cursor:
+                            cursor.execute(
+                                "INSERT INTO item VALUES (%s)", (value,)
+                            )
+                except OperationalError as error:
+                    errors.append(error)
+
+    workers = [threading.Thread(target=write) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert not errors, (
+        "Убедитесь, что пишущие потоки ждут своей очереди, а не получают "
+        "ошибку блокировки."
+    )
+    with pooled(database) as wrapper:
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT count(DISTINCT value) FROM item")
+            assert cursor.fetchone()[0] == threads * iterations, (
+                "Убедитесь, что транзакции записи не пересекаются."
+            )
+
+
+def test_full_write_queue_raises(database):
+    queue = get_pool(database["NAME"], 2, 8, 5).writer
+    release = threading.Event()
+    results = []
+
+    def hold():
+        with pooled(database), transaction.atomic(using=ALIAS):
+            release.wait(5)
+
+    def wait():
+        with pooled(database), transaction.atomic(using=ALIAS):
+            results.append(True)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    waiters = [threading.Thread(target=wait) for _ in range(queue.size)]
+    try:
+        while not queue._busy:
+            time.sleep(0.01)
+        for waiter in waiters:
+            waiter.start()
+        while queue.waiting < queue.size:
+            time.sleep(0.01)
+        with pooled(database) as wrapper:
+            with pytest.raises(OperationalError, match="очередь"):
+                with transaction.atomic(using=ALIAS):
+                    pass
+            assert wrapper.writer is None
+    finally:
+        release.set()
+        holder.join()
+        for waiter in waiters:
+            waiter.join()
+    assert len(results) == queue.size
+
+
+@pytest.mark.parametrize(
+    "sql, write",
+    [
+        ("WITH new(value) AS (SELECT 1) INSERT INTO item SELECT * FROM new",
+         True),
+        ("with old AS (SELECT 1) delete FROM item", True),
+        ("WITH x AS (SELECT 1) SELECT * FROM x", False),
+        ("SELECT 1", False),
+    ],
+)
+def test_cte_statements_routed(database, sql, write):
+    with pooled(database) as wrapper, wrapper.cursor() as cursor:
+        cursor.execute(sql)
+        assert (wrapper.connection is wrapper.writer) == write, (
+            "Убедитесь, что изменяющий запрос с WITH выполняется на "
+            "пишущем соединении, а чтение с WITH - на читающем."
+        )
+
+
+def test_health_check_replaces_broken_reader(database):
+    with pooled(database) as wrapper:
+        wrapper.ensure_connection()
+        assert wrapper.is_usable()
+        broken = wrapper.reader
+        broken.close()
+        assert not wrapper.is_usable(), (
+            "Убедитесь, что CONN_HEALTH_CHECKS действительно проверяет "
+            "соединение запросом."
+        )
+    # закрытое соединение не возвращается в пул
+    with pooled(database) as wrapper:
+        assert count(wrapper) == 0
+        assert wrapper.reader is not broken
+
+
+def test_pool_skips_broken_reader(database):
+    pool = get_pool(database["NAME"], 2, 8, 5)
+    broken = sqlite3.connect(database["NAME"])
+    pool.readers.put_nowait(broken)
+    broken.close()
+    reader = pool.acquire_reader(lambda: sqlite3.connect(database["NAME"]))
+    assert reader is not broken, (
+        "Убедитесь, что пул проверяет соединение перед повторной выдачей."
+    )
+    pool.release_reader(reader)
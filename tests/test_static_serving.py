@@ -0,0 +1,76 @@
+import gzip
+
+import pytest
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+
+pytestmark = [pytest.mark.django_db]
+
+CSS = "body { color: #333; }\n" * 200
+
+
+@pytest.fixture
+def collected(settings, tmp_path):
+    source = tmp_path / "source"
+    (source / "css").mkdir(parents=True)
+    (source / "css" / "site.css").write_text(CSS)
+    (source / "logo.png").write_bytes(b"\x89PNG not really" * 100)
+    settings.STATICFILES_DIRS = [source]
+    settings.STATICFILES_FINDERS = [
+        "django.contrib.staticfiles.finders.FileSystemFinder"
+    ]
+    settings.STATIC_ROOT = tmp_path / "collected"
+    call_command("collectstatic", interactive=False, verbosity=0)
+    return settings.STATIC_ROOT
+
+
+def body(response):
+    return b"".join(response.streaming_content)
+
+
+def test_collectstatic_hashes_and_compresses(collected):
+    name = staticfiles_storage.stored_name("css/site.css")
+    assert name != "css/site.css", (
+        "Убедитесь, что собранная статика получает хэш в имени."
+    )
+    assert (collected / f"{name}.gz").is_file()
+    assert gzip.decompress(
+        (collected / f"{name}.gz").read_bytes()
+    ).decode() == CSS
+    logo = staticfiles_storage.stored_name("logo.png")
+    assert not (collected / f"{logo}.gz").exists(), (
+        "Убедитесь, что изображения не сжимаются повторно."
+    )
+
+
+def test_precompressed_variant_served(client, collected):
+    url = staticfiles_storage.url("css/site.css")
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert response["Content-Type"].startswith("text/css")
+    assert "Accept-Encoding" in response["Vary"]
+    assert "immutable" in response["Cache-Control"]
+    assert gzip.decompress(body(response)).decode() == CSS
+
+    plain = client.get(url, HTTP_ACCEPT_ENCODING="identity")
+    assert not plain.has_header("Content-Encoding")
+    assert body(plain).decode() == CSS
+    assert plain["ETag"] != response["ETag"], (
+        "Убедитесь, что у сжатой и исходной версии разные ETag."
+    )
+
+
+def test_unhashed_name_not_immutable(client, collected):
+    response = client.get("/static/css/site.css")
+    assert response.status_code == 200
+    assert "immutable" not in response["Cache-Control"]
+
+
+def test_templates_use_hashed_urls(client, collected, settings):
+    settings.STATICFILES_DIRS = [settings.BASE_DIR / "static"]
+    call_command("collectstatic", interactive=False, verbosity=0)
+    content = client.get("/").content.decode()
+    icon = staticfiles_storage.stored_name("img/fav/favicon.ico")
+    assert f"/static/{icon}" in content
+    assert client.get(f"/static/{icon}").status_code == 200
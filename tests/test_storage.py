@@ -0,0 +1,118 @@
+from io import BytesIO, StringIO
+
+import pytest
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.images import ImageFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+
+from blog.models import Post, StoredFile
+from blog.storage import ContentAddressedStorage, is_hashed_name
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def image_file(name="meme.jpg"):
+    buffer = BytesIO()
+    Image.new("RGB", (300, 200), "purple").save(buffer, "JPEG")
+    buffer.seek(0)
+    return ImageFile(buffer, name=name)
+
+
+def stored_files(media_root):
+    return sorted(
+        path.relative_to(media_root).as_posix()
+        for path in media_root.rglob("*") if path.is_file()
+    )
+
+
+def test_sharded_name_and_dedupe(media_root):
+    storage = ContentAddressedStorage()
+    first = storage.save("post_images/a.JPG", ContentFile(b"same"))
+    second = storage.save("post_images/b.jpg", ContentFile(b"same"))
+    assert first == second
+    directory, shard, subshard, filename = first.split("/")
+    assert directory == "post_images" and filename.endswith(".jpg")
+    assert filename.startswith(shard + subshard)
+    assert stored_files(media_root) == [first]
+    assert storage.references(first) == 2
+
+    storage.delete(first)
+    assert storage.exists(first), (
+        "Убедитесь, что файл не удаляется, пока на него есть ссылки."
+    )
+    storage.delete(first)
+    assert not storage.exists(first)
+    assert not StoredFile.objects.exists()
+
+
+def test_identical_uploads_stored_once(
+    mixer, user, published_category, media_root,
+    django_capture_on_commit_callbacks,
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        posts = [
+            mixer.blend(
+                "blog.Post", author=user, category=published_category,
+                image=image_file(),
+            )
+            for _ in range(2)
+        ]
+    for post in posts:
+        post.refresh_from_db()
+    assert posts[0].image.name == posts[1].image.name
+    assert is_hashed_name(posts[0].image.name)
+    files = stored_files(media_root)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        posts[0].delete()
+    assert stored_files(media_root) == files
+    with django_capture_on_commit_callbacks(execute=True):
+        posts[1].delete()
+    assert stored_files(media_root) == [], (
+        "Убедитесь, что файлы удаляются вместе с последней публикацией."
+    )
+
+
+def test_migrate_media_storage(
+    mixer, user, published_category, media_root
+):
+    legacy = FileSystemStorage().save("post_images/old.jpg", image_file())
+    posts = mixer.cycle(2).blend(
+        "blog.Post", author=user, category=published_category
+    )
+    Post.objects.update(image=legacy)
+
+    call_command("migrate_media_storage", chunk_size=1, stdout=StringIO())
+
+    names = set(Post.objects.values_list("image", flat=True))
+    assert len(names) == 1
+    name = names.pop()
+    assert is_hashed_name(name)
+    assert stored_files(media_root) == [name]
+    assert ContentAddressedStorage().references(name) == len(posts)
+
+
+def test_shared_legacy_file_kept(
+    mixer, user, published_category, media_root,
+    django_capture_on_commit_callbacks,
+):
+    legacy = FileSystemStorage().save("post_images/old.jpg", image_file())
+    posts = mixer.cycle(2).blend(
+        "blog.Post", author=user, category=published_category
+    )
+    Post.objects.update(image=legacy)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Post.objects.get(pk=posts[0].pk).delete()
+    assert stored_files(media_root) == [legacy], (
+        "Убедитесь, что файл, сохранённый до хранилища по содержимому, не "
+        "удаляется вместе с публикацией: на него могут ссылаться другие."
+    )
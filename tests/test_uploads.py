@@ -0,0 +1,105 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def jpeg(width, height, exif=None, noise=False):
+    image = (
+        Image.effect_noise((width, height), 100).convert("RGB")
+        if noise else Image.new("RGB", (width, height), "teal")
+    )
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif or b"")
+    return SimpleUploadedFile(
+        "photo.jpg", buffer.getvalue(), content_type="image/jpeg"
+    )
+
+
+def create_post(client, published_category, image):
+    return client.post(
+        "/posts/create/",
+        {
+            "title": "Фото",
+            "text": "Текст",
+            "pub_date": "2020-01-01 10:00",
+            "category": published_category.id,
+            "is_published": True,
+            "image": image,
+        },
+    )
+
+
+def test_oversized_upload_rejected(
+    settings, user_client, published_category
+):
+    settings.BLOG_UPLOAD_MAX_BYTES = 20_000
+    response = create_post(
+        user_client, published_category, jpeg(400, 400, noise=True)
+    )
+    assert response.status_code == 200
+    assert "image" in response.context["form"].errors, (
+        "Убедитесь, что слишком большой файл отклоняется с ошибкой формы."
+    )
+    assert not Post.objects.exists()
+
+
+def test_pixel_limit_from_header(
+    settings, monkeypatch, user_client, published_category
+):
+    small, large = jpeg(200, 200), jpeg(200, 200)
+    Image.init()
+
+    def no_full_decode(*args, **kwargs):
+        raise AssertionError("изображение не должно декодироваться целиком")
+
+    monkeypatch.setattr(Image.Image, "verify", no_full_decode)
+    monkeypatch.setattr(ImageFile.ImageFile, "load", no_full_decode)
+    settings.BLOG_IMAGE_MAX_PIXELS = 100 * 100
+    response = create_post(user_client, published_category, small)
+    assert "image" in response.context["form"].errors
+    assert not Post.objects.exists()
+
+    settings.BLOG_IMAGE_MAX_PIXELS = 200 * 200
+    response = create_post(user_client, published_category, large)
+    assert response.status_code == 302
+    assert Post.objects.exists()
+
+
+def test_exif_stripped_and_rotated_in_worker(
+    user_client, published_category, media_root,
+    django_capture_on_commit_callbacks,
+):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # повёрнуто на 90° по часовой стрелке
+    exif[0x010F] = "Phone maker"
+    with django_capture_on_commit_callbacks(execute=True):
+        create_post(
+            user_client, published_category, jpeg(300, 200, exif=exif)
+        )
+    post = Post.objects.get()
+    with Image.open(post.image.path) as image:
+        assert image.size == (200, 300)
+        assert not image.getexif(), (
+            "Убедитесь, что из загруженного изображения удаляются "
+            "метаданные EXIF."
+        )
+    assert post.image_renditions["source"] == post.image.name
+    originals = [
+        path.relative_to(media_root).as_posix()
+        for path in (media_root / "post_images").glob("??/??/*.jpg")
+    ]
+    assert originals == [post.image.name], (
+        "Убедитесь, что после очистки метаданных исходный файл удаляется."
+    )